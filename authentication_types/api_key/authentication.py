@@ -5,6 +5,7 @@ from common.types import InputType, ConnectionParam
 # -----------------------------------------------------#
 
 import requests
+from types import MappingProxyType
 
 ### Connection Parameters
 API_URL = ConnectionParam(
@@ -19,17 +20,23 @@ API_KEY = ConnectionParam(
 )
 ### End of Connection Parameters
 
+# Seconds before an HTTP call to the provider is abandoned
+REQUEST_TIMEOUT = 30
+
 
 class MyIntegrationProvider:
     def __init__(self, auth_params):
         self.api_url = API_URL.read_value(auth_params)
         self.api_key = API_KEY.read_value(auth_params)
+        self.headers = MappingProxyType(
+            {
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json",
+            }
+        )
 
     def get_headers(self):
-        return {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
+        return self.headers
 
 
 def test_authentication(auth_params):  # must have function
@@ -38,7 +45,9 @@ def test_authentication(auth_params):  # must have function
         integration = MyIntegrationProvider(auth_params)
         url = f"{integration.api_url}/auth"
         headers = integration.get_headers()
-        response = requests.post(url, headers=headers, json={})
+        response = requests.post(
+            url, headers=headers, json={}, timeout=REQUEST_TIMEOUT
+        )
         if response.status_code >= 200 and response.status_code < 300:
             return 200
         return 401
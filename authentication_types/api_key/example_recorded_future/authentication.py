@@ -1,10 +1,13 @@
 from common.types import InputType, ConnectionParam
+from common.circuit_breaker import CircuitBreaker
+from common.http_client import make_session, DEFAULT_TIMEOUT
 
 # -----------------------------------------------------#
 # Copy the code below and ignore the libraries above
 # -----------------------------------------------------#
 
 import requests
+from types import MappingProxyType
 
 
 ### Connection Parameters
@@ -18,6 +21,12 @@ API_KEY = ConnectionParam(
     description="API Key for Recorded Future",
     input_type=InputType.PASSWORD,
 )
+HTTP_TRANSPORT = ConnectionParam(
+    "HTTP_TRANSPORT",
+    description="'http1' (default) or 'http2' to multiplex concurrent requests over one connection",
+    input_type=InputType.TEXT,
+    optional=True,
+)
 ### End of Connection Parameters
 
 
@@ -25,12 +34,19 @@ class RecordedFutureAuthentication:
     def __init__(self, auth_params):
         self.api_url = API_URL.read_value(auth_params)
         self.api_key = API_KEY.read_value(auth_params)
+        self.breaker = CircuitBreaker()
+        self.session = make_session(
+            HTTP_TRANSPORT.read_value(auth_params), breaker=self.breaker
+        )
+        self.headers = MappingProxyType(
+            {
+                "X-RFToken": self.api_key,
+                "accept": "application/json",
+            }
+        )
 
     def get_headers(self):
-        return {
-            "X-RFToken": self.api_key,
-            "accept": "application/json",
-        }
+        return self.headers
 
 
 def test_authentication(auth_params):  # must have function
@@ -40,7 +56,9 @@ def test_authentication(auth_params):  # must have function
         url = f"{integration.api_url}/alert/v3"
         headers = integration.get_headers()
         payload = {"limit": 1}
-        response = requests.get(url, headers=headers, json=payload)
+        response = requests.get(
+            url, headers=headers, json=payload, timeout=DEFAULT_TIMEOUT
+        )
         if response.status_code == 200:
             return 200
         return 401
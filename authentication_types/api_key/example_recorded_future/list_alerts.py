@@ -1,13 +1,35 @@
 from .authentication import RecordedFutureAuthentication
-from common.types import InputParameter, DataType, OutputParameter
+from common.types import (
+    InputParameter,
+    DataType,
+    OutputParameter,
+    compile_outputs,
+)
+from common.registry import (
+    get_provider,
+    invalidate_provider,
+    is_auth_failure,
+)
+from common.deadline import (
+    DeadlineExceeded,
+    DEADLINE_EXCEEDED_STATUS,
+    with_deadline,
+)
+from common.circuit_breaker import CircuitOpenError, CIRCUIT_OPEN_STATUS
+from common.batch import run_batch
+from common.memo import side_effects
+from common.streaming import page_chunk, error_chunk
+from common.large_output import read_records
+from common.json_stream import read_json_items
+from common.lru import LRUCache
 
 # -----------------------------------------------------#
 # Copy the code below and ignore the libraries above
 # -----------------------------------------------------#
 
-import requests
 from datetime import datetime, timezone  # import extra libraries if needed
 import time  # import extra libraries if needed
+import hashlib
 
 ### Input Parameters
 INSTANCE = InputParameter(
@@ -63,13 +85,37 @@ DIRECTION = InputParameter(
     data_type=DataType.STRING,
     optional=True,
 )
+SPILL_THRESHOLD = InputParameter(
+    "SPILL_THRESHOLD",
+    description="Alerts size in bytes above which alerts are written to an NDJSON file and a file handle is returned instead (unset or 0 keeps alerts inline)",
+    data_type=DataType.INT,
+    optional=True,
+)
+FIELDS = InputParameter(
+    "FIELDS",
+    description="Comma separated list of alert fields to return (e.g. id,title,triggered)",
+    data_type=DataType.STRING,
+    optional=True,
+)
+DEDUP = InputParameter(
+    "DEDUP",
+    description="Handling of alerts already returned by an earlier call on this connection: 'off' (default), 'drop' or 'flag'",
+    data_type=DataType.STRING,
+    optional=True,
+)
+TIMEOUT = InputParameter(
+    "TIMEOUT",
+    description="Total time budget in seconds for the skill run; every request and poll is bounded by what is left (default 120)",
+    data_type=DataType.INT,
+    optional=True,
+)
 ### End of Input Parameters
 
 ### Output Parameters
 STATUS = OutputParameter(
     name="STATUS",
     description="Status of the skill execution",
-    data_type=DataType.STRING,
+    data_type=DataType.INT,
 )
 ALERTS = OutputParameter(
     name="ALERTS",
@@ -78,57 +124,149 @@ ALERTS = OutputParameter(
 )
 ### End of Output Parameters
 
+# Coerces the outputs of every result to their declared types
+OUTPUTS = compile_outputs(STATUS, ALERTS)
 
-def run_skill(input_params, auth_params):
-    """This will be called to run the skill"""
-    integration = RecordedFutureAuthentication(auth_params)
-    ## Logic Starts Here
-    try:
-        api_start_time = time.time()
+# Time budget of a run_skill call unless TIMEOUT is set
+DEFAULT_TIMEOUT_BUDGET = 2 * 60
 
-        # Read all input parameters
-        start_time = START_TIME.read_value(input_params)
-        end_time = END_TIME.read_value(input_params)
+# Items of a run_skill_batch call executed at the same time
+BATCH_CONCURRENCY = 8
 
-        # Set end_time to current time if start_time provided but no end_time
-        if start_time and not end_time:
-            end_time = int(datetime.now().timestamp())
+# Alert ids remembered per connection for DEDUP
+SEEN_ALERTS_PER_CONNECTION = 50000
+_seen_alerts = LRUCache(maxsize=256)
 
-        # Build payload
-        payload = {}
+# Alerts per page requested by run_skill_stream
+STREAM_PAGE_SIZE = 100
+
+
+def _seen_alerts_for(integration):
+    connection_key = (
+        integration.api_url,
+        hashlib.sha256(str(integration.api_key).encode()).hexdigest(),
+    )
+    return _seen_alerts.get_or_set(
+        connection_key, lambda: LRUCache(maxsize=SEEN_ALERTS_PER_CONNECTION)
+    )
 
-        # Handle time range
-        if start_time and end_time:
-            start_dt = datetime.fromtimestamp(
-                start_time, timezone.utc
-            ).strftime("%Y-%m-%dT%H:%M:%S.000Z")
-            end_dt = datetime.fromtimestamp(end_time, timezone.utc).strftime(
-                "%Y-%m-%dT%H:%M:%S.000Z"
-            )
-            payload["triggered"] = f"[{start_dt}, {end_dt}]"
-
-        # Add optional parameters to payload
-        optional_params = {
-            "assignee": ASSIGNEE.read_value(input_params),
-            "statusInPortal": STATUS_IN_PORTAL.read_value(input_params),
-            "limit": LIMIT.read_value(input_params),
-            "from": FROM_INDEX.read_value(input_params),
-            "orderBy": ORDER_BY.read_value(input_params),
-            "direction": DIRECTION.read_value(input_params),
-        }
 
-        # Add non-None values to payload
-        payload.update(
-            {k: v for k, v in optional_params.items() if v is not None}
+def _dedup_alerts(integration, alerts, mode, delivered):
+    """
+    Drop or flag alerts an earlier call on this connection returned. Ids of
+    the alerts passed on are appended to `delivered`; they only count as
+    seen once the caller has handed them out (see _mark_delivered).
+    """
+    seen = _seen_alerts_for(integration)
+    in_this_call = set()
+    for alert in alerts:
+        alert_id = alert.get("id")
+        if alert_id is None:
+            yield alert
+            continue
+        if alert_id not in seen and alert_id not in in_this_call:
+            in_this_call.add(alert_id)
+            delivered.append(alert_id)
+            yield alert
+        elif mode == "flag":
+            alert["previously_returned"] = True
+            yield alert
+
+
+def _mark_delivered(integration, alert_ids):
+    """Remember alerts that reached the caller so later calls dedup them"""
+    seen = _seen_alerts_for(integration)
+    for alert_id in alert_ids:
+        seen.add(alert_id)
+
+
+def _build_payload(input_params):
+    """Build the /alert/v3 query parameters and read the DEDUP mode"""
+    # Read all input parameters
+    start_time = START_TIME.read_value(input_params)
+    end_time = END_TIME.read_value(input_params)
+
+    # Set end_time to current time if start_time provided but no end_time
+    if start_time and not end_time:
+        end_time = int(datetime.now().timestamp())
+
+    # Build payload
+    payload = {}
+
+    # Handle time range
+    if start_time and end_time:
+        start_dt = datetime.fromtimestamp(
+            start_time, timezone.utc
+        ).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        end_dt = datetime.fromtimestamp(end_time, timezone.utc).strftime(
+            "%Y-%m-%dT%H:%M:%S.000Z"
         )
+        payload["triggered"] = f"[{start_dt}, {end_dt}]"
+
+    # Add optional parameters to payload
+    optional_params = {
+        "assignee": ASSIGNEE.read_value(input_params),
+        "statusInPortal": STATUS_IN_PORTAL.read_value(input_params),
+        "limit": LIMIT.read_value(input_params),
+        "from": FROM_INDEX.read_value(input_params),
+        "orderBy": ORDER_BY.read_value(input_params),
+        "direction": DIRECTION.read_value(input_params),
+        "fields": FIELDS.read_value(input_params),
+    }
+
+    dedup = DEDUP.read_value(input_params) or "off"
+    if dedup not in ("off", "drop", "flag"):
+        raise ValueError(f"Unsupported DEDUP mode: {dedup}")
+    # Dedup needs the alert id even when the caller projects fields
+    fields = optional_params["fields"]
+    if dedup != "off" and fields:
+        field_names = [f.strip() for f in fields.split(",")]
+        if "id" not in field_names:
+            optional_params["fields"] = ",".join(field_names + ["id"])
+
+    # Add non-None values to payload
+    payload.update(
+        {k: v for k, v in optional_params.items() if v is not None}
+    )
+    return payload, dedup
+
+
+@OUTPUTS
+@side_effects
+@with_deadline(TIMEOUT, DEFAULT_TIMEOUT_BUDGET, ALERTS)
+def run_skill(input_params, auth_params):
+    """This will be called to run the skill"""
+    integration = get_provider(RecordedFutureAuthentication, auth_params)
+    ## Logic Starts Here
+    try:
+        api_start_time = time.time()
+
+        payload, dedup = _build_payload(input_params)
 
         url = f"{integration.api_url}/alert/v3"
         headers = integration.get_headers()
 
-        response = requests.get(url, headers=headers, params=payload)
-        response.raise_for_status()
-
-        alerts = response.json()
+        delivered = []
+        response = integration.session.get(
+            url, headers=headers, params=payload, stream=True
+        )
+        with response:
+            response.raise_for_status()
+            # Large alert sets are spilled to disk while they download
+            alerts = read_records(
+                response,
+                "data",
+                threshold=SPILL_THRESHOLD.read_value(input_params),
+                transform=(
+                    None
+                    if dedup == "off"
+                    else lambda data: _dedup_alerts(
+                        integration, data, dedup, delivered
+                    )
+                ),
+            )
+        # Only a complete download counts: a failed one is returned again
+        _mark_delivered(integration, delivered)
         print(
             f"Alerts fetched successfully, time_taken={time.time() - api_start_time}"
         )
@@ -136,9 +274,104 @@ def run_skill(input_params, auth_params):
             "STATUS": response.status_code,
             "ALERTS": alerts,
         }
+    except CircuitOpenError as e:
+        return {
+            "STATUS": CIRCUIT_OPEN_STATUS,
+            "ALERTS": str(e),
+        }
+    except DeadlineExceeded as e:
+        return {
+            "STATUS": DEADLINE_EXCEEDED_STATUS,
+            "ALERTS": str(e),
+        }
     except Exception as e:
+        if is_auth_failure(e):
+            # Rejected credentials: build a fresh provider on the next call
+            invalidate_provider(RecordedFutureAuthentication, auth_params)
         return {
             "STATUS": 500,
             "ALERTS": str(e),
         }
     ## Logic Ends Here
+
+
+def run_skill_batch(list_of_input_params, auth_params):
+    """
+    Optional batch entry point. Fetches alerts for each input_params
+    with one shared provider, session and token; results keep input order.
+    """
+    return run_batch(
+        lambda input_params: run_skill(input_params, auth_params),
+        list_of_input_params,
+        max_concurrency=BATCH_CONCURRENCY,
+    )
+
+
+@OUTPUTS
+@with_deadline(TIMEOUT, DEFAULT_TIMEOUT_BUDGET, ALERTS)
+def run_skill_stream(input_params, auth_params):
+    """
+    Optional streaming entry point. Pages through /alert/v3 and yields each
+    page as soon as it arrives; LIMIT caps the total number of alerts.
+    """
+    integration = get_provider(RecordedFutureAuthentication, auth_params)
+    try:
+        payload, dedup = _build_payload(input_params)
+        limit = payload.get("limit")
+        offset = payload.get("from") or 0
+
+        url = f"{integration.api_url}/alert/v3"
+        headers = integration.get_headers()
+
+        returned = 0
+        page_number = 0
+        while True:
+            page_size = STREAM_PAGE_SIZE
+            if limit is not None:
+                page_size = min(page_size, limit - returned)
+            payload["from"] = offset
+            payload["limit"] = page_size
+
+            response = integration.session.get(
+                url, headers=headers, params=payload, stream=True
+            )
+            with response:
+                response.raise_for_status()
+                alerts = read_json_items(response, "data")
+
+            page_alerts = len(alerts.get("data", []))
+            offset += page_alerts
+            returned += page_alerts
+            page_number += 1
+            total = alerts.get("counts", {}).get("total")
+            done = (
+                page_alerts < page_size
+                or (limit is not None and returned >= limit)
+                or (total is not None and offset >= total)
+            )
+
+            delivered = []
+            if dedup != "off":
+                alerts["data"] = list(
+                    _dedup_alerts(
+                        integration, alerts.get("data", []), dedup, delivered
+                    )
+                )
+            try:
+                yield page_chunk(
+                    ALERTS.name, alerts, page_number, returned, total, done
+                )
+            finally:
+                # Runs once the consumer has taken the chunk
+                _mark_delivered(integration, delivered)
+            if done:
+                break
+    except CircuitOpenError as e:
+        yield error_chunk(ALERTS.name, e, status=CIRCUIT_OPEN_STATUS)
+    except DeadlineExceeded as e:
+        yield error_chunk(ALERTS.name, e, status=DEADLINE_EXCEEDED_STATUS)
+    except Exception as e:
+        if is_auth_failure(e):
+            # Rejected credentials: build a fresh provider on the next call
+            invalidate_provider(RecordedFutureAuthentication, auth_params)
+        yield error_chunk(ALERTS.name, e)
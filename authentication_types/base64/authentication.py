@@ -6,6 +6,7 @@ from common.types import InputType, ConnectionParam
 
 import requests
 import base64
+from types import MappingProxyType
 
 
 ### Connection Parameters
@@ -26,21 +27,27 @@ BASE_URL = ConnectionParam(
 )
 ### End of Connection Parameters
 
+# Seconds before an HTTP call to the provider is abandoned
+REQUEST_TIMEOUT = 30
+
 
 class MyIntegrationProvider:
     def __init__(self, auth_params):
         self.username = USERNAME.read_value(auth_params)
         self.password = PASSWORD.read_value(auth_params)
         self.base_url = BASE_URL.read_value(auth_params)
-
-    def get_headers(self):
         base64_credentials = base64.b64encode(
             f"{self.username}:{self.password}".encode()
         ).decode()
-        return {
-            "Authorization": f"Basic {base64_credentials}",
-            "Content-Type": "application/json",
-        }
+        self.headers = MappingProxyType(
+            {
+                "Authorization": f"Basic {base64_credentials}",
+                "Content-Type": "application/json",
+            }
+        )
+
+    def get_headers(self):
+        return self.headers
 
 
 def test_authentication(auth_params):  # must have function
@@ -49,7 +56,9 @@ def test_authentication(auth_params):  # must have function
         integration = MyIntegrationProvider(auth_params)
         url = f"{integration.base_url}/auth"
         headers = integration.get_headers()
-        response = requests.post(url, headers=headers, json={})
+        response = requests.post(
+            url, headers=headers, json={}, timeout=REQUEST_TIMEOUT
+        )
         if response.status_code >= 200 and response.status_code < 300:
             return 200
         return 401
@@ -1,4 +1,6 @@
 from common.types import InputType, ConnectionParam
+from common.circuit_breaker import CircuitBreaker
+from common.http_client import ProviderSession, DEFAULT_TIMEOUT
 
 # -----------------------------------------------------#
 # Copy the code below and ignore the libraries above
@@ -6,6 +8,7 @@ from common.types import InputType, ConnectionParam
 
 import requests
 import base64
+from types import MappingProxyType
 
 
 ### Connection Parameters
@@ -27,14 +30,19 @@ class BambooHRAuthentication:
         self.api_key = API_KEY.read_value(auth_params)
         self.company_domain = COMPANY_DOMAIN.read_value(auth_params)
         self.base_url = f"https://{self.company_domain}/api/v1"
-
-    def get_headers(self):
+        self.breaker = CircuitBreaker()
+        self.session = ProviderSession(breaker=self.breaker)
         credentials = f"{self.api_key}:x"  # BambooHR uses API key as username and 'x' as password
         base64_credentials = base64.b64encode(credentials.encode()).decode()
-        return {
-            "Authorization": f"Basic {base64_credentials}",
-            "Content-Type": "application/json",
-        }
+        self.headers = MappingProxyType(
+            {
+                "Authorization": f"Basic {base64_credentials}",
+                "Content-Type": "application/json",
+            }
+        )
+
+    def get_headers(self):
+        return self.headers
 
 
 def test_authentication(auth_params):  # must have function
@@ -50,7 +58,9 @@ def test_authentication(auth_params):  # must have function
             "onlyCurrent": "1",
         }
 
-        response = requests.get(url, headers=headers, params=params)
+        response = requests.get(
+            url, headers=headers, params=params, timeout=DEFAULT_TIMEOUT
+        )
         response.raise_for_status()
 
         return 200
@@ -1,12 +1,29 @@
 from .authentication import BambooHRAuthentication
-from common.types import InputParameter, DataType, OutputParameter
+from common.types import (
+    InputParameter,
+    DataType,
+    OutputParameter,
+    compile_outputs,
+)
+from common.registry import (
+    get_provider,
+    invalidate_provider,
+    is_auth_failure,
+)
+from common.deadline import (
+    DeadlineExceeded,
+    DEADLINE_EXCEEDED_STATUS,
+    with_deadline,
+)
+from common.circuit_breaker import CircuitOpenError, CIRCUIT_OPEN_STATUS
+from common.batch import run_batch
+from common.memo import memoize
+from common.streaming import single_chunk
 
 # -----------------------------------------------------#
 # Copy the code below and ignore the libraries above
 # -----------------------------------------------------#
 
-import requests
-
 ### Input Parameters
 INSTANCE = InputParameter(
     "INSTANCE",
@@ -43,13 +60,19 @@ FILTER_VALUE = InputParameter(
     data_type=DataType.STRING,
     optional=True,
 )
+TIMEOUT = InputParameter(
+    "TIMEOUT",
+    description="Total time budget in seconds for the skill run; every request and poll is bounded by what is left (default 120)",
+    data_type=DataType.INT,
+    optional=True,
+)
 ### End of Input Parameters
 
 ### Output Parameters
 STATUS = OutputParameter(
     name="STATUS",
     description="Status of the skill execution",
-    data_type=DataType.STRING,
+    data_type=DataType.INT,
 )
 EMPLOYEES = OutputParameter(
     name="EMPLOYEES",
@@ -58,13 +81,28 @@ EMPLOYEES = OutputParameter(
 )
 ### End of Output Parameters
 
+# Coerces the outputs of every result to their declared types
+OUTPUTS = compile_outputs(STATUS, EMPLOYEES)
 
+# Time budget of a run_skill call unless TIMEOUT is set
+DEFAULT_TIMEOUT_BUDGET = 2 * 60
+
+# Seconds an identical lookup is answered from the result cache
+RESULT_TTL = 15 * 60
+
+# Items of a run_skill_batch call executed at the same time
+BATCH_CONCURRENCY = 8
+
+
+@OUTPUTS
+@memoize(ttl=RESULT_TTL)
+@with_deadline(TIMEOUT, DEFAULT_TIMEOUT_BUDGET, EMPLOYEES)
 def run_skill(input_params, auth_params):
     """
     This will be called to run the skill.
     Gets user details from BambooHR using various filter criteria.
     """
-    integration = BambooHRAuthentication(auth_params)
+    integration = get_provider(BambooHRAuthentication, auth_params)
     ## Logic Starts Here
     try:
         # Get input parameters
@@ -124,7 +162,9 @@ def run_skill(input_params, auth_params):
         url = f"https://api.bamboohr.com/api/gateway.php/{subdomain}/v1/datasets/employee"
         headers = integration.get_headers()
 
-        response = requests.post(url, headers=headers, json=payload)
+        response = integration.session.post(
+            url, headers=headers, json=payload
+        )
         response.raise_for_status()
 
         response_json = response.json()
@@ -138,9 +178,49 @@ def run_skill(input_params, auth_params):
             "STATUS": response.status_code,
             "EMPLOYEES": response_json,
         }
+    except CircuitOpenError as e:
+        return {
+            "STATUS": CIRCUIT_OPEN_STATUS,
+            "EMPLOYEES": str(e),
+        }
+    except DeadlineExceeded as e:
+        return {
+            "STATUS": DEADLINE_EXCEEDED_STATUS,
+            "EMPLOYEES": str(e),
+        }
     except Exception as e:
+        if is_auth_failure(e):
+            # Rejected credentials: build a fresh provider on the next call
+            invalidate_provider(BambooHRAuthentication, auth_params)
         return {
             "STATUS": 500,
             "EMPLOYEES": str(e),
         }
     ## Logic Ends Here
+
+
+def run_skill_batch(list_of_input_params, auth_params):
+    """
+    Optional batch entry point. Looks up employees for each input_params
+    with one shared provider, session and token; results keep input order.
+    """
+    return run_batch(
+        lambda input_params: run_skill(input_params, auth_params),
+        list_of_input_params,
+        max_concurrency=BATCH_CONCURRENCY,
+    )
+
+
+@OUTPUTS
+@with_deadline(TIMEOUT, DEFAULT_TIMEOUT_BUDGET, EMPLOYEES)
+def run_skill_stream(input_params, auth_params):
+    """
+    Optional streaming entry point. The employee dataset lookup is a single
+    request, so the result is yielded as one final chunk.
+    """
+    result = run_skill(input_params, auth_params)
+    employees = result.get("EMPLOYEES")
+    count = 0
+    if isinstance(employees, dict):
+        count = len(employees.get("data", []))
+    yield single_chunk(result, count)
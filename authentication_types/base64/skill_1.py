@@ -1,4 +1,8 @@
-from .authentication import MyIntegrationProvider, test_authentication
+from .authentication import (
+    MyIntegrationProvider,
+    test_authentication,
+    REQUEST_TIMEOUT,
+)
 from common.types import InputType, InputParameter, DataType, OutputParameter
 
 # -----------------------------------------------------#
@@ -7,6 +11,15 @@ from common.types import InputType, InputParameter, DataType, OutputParameter
 
 import requests
 
+try:
+    # Reuses one provider per connection when the runtime ships common/
+    from common.registry import get_provider
+except ImportError:
+
+    def get_provider(provider_class, auth_params):
+        return provider_class(auth_params)
+
+
 ### Input Parameters
 INSTANCE = InputParameter(
     "INSTANCE",
@@ -48,7 +61,7 @@ LOGS = OutputParameter(
 
 def run_skill(input_params, auth_params):
     """This will be called to run the skill"""
-    integration = MyIntegrationProvider(auth_params)
+    integration = get_provider(MyIntegrationProvider, auth_params)
     test_authentication(auth_params)
 
     try:
@@ -68,7 +81,9 @@ def run_skill(input_params, auth_params):
 
         url = f"{integration.base_url}/search"
         headers = integration.get_headers()
-        response = requests.post(url=url, headers=headers, json=payload)
+        response = requests.post(
+            url=url, headers=headers, json=payload, timeout=REQUEST_TIMEOUT
+        )
         response.raise_for_status()
         return {
             "STATUS": response.status_code,
@@ -6,6 +6,7 @@ from common.types import InputType, ConnectionParam
 
 import requests
 from requests.auth import HTTPBasicAuth
+from types import MappingProxyType
 
 
 ### Connection Parameters
@@ -26,6 +27,9 @@ BASE_URL = ConnectionParam(
 )
 ### End of Connection Parameters
 
+# Seconds before an HTTP call to the provider is abandoned
+REQUEST_TIMEOUT = 30
+
 
 class MyIntegrationProvider:
     def __init__(self, auth_params):
@@ -33,11 +37,14 @@ class MyIntegrationProvider:
         self.password = PASSWORD.read_value(auth_params)
         self.base_url = BASE_URL.read_value(auth_params)
         self.auth = HTTPBasicAuth(self.username, self.password)
+        self.headers = MappingProxyType(
+            {
+                "Content-Type": "application/json",
+            }
+        )
 
     def get_headers(self):
-        return {
-            "Content-Type": "application/json",
-        }
+        return self.headers
 
 
 def test_authentication(auth_params):  # must have function
@@ -46,7 +53,12 @@ def test_authentication(auth_params):  # must have function
         integration = MyIntegrationProvider(auth_params)
         url = f"{integration.base_url}/auth"
         headers = integration.get_headers()
-        response = requests.post(url, headers=headers, auth=integration.auth)
+        response = requests.post(
+            url,
+            headers=headers,
+            auth=integration.auth,
+            timeout=REQUEST_TIMEOUT,
+        )
         if response.status_code >= 200 and response.status_code < 300:
             return 200
         return 401
@@ -1,12 +1,18 @@
 from common.types import InputType, ConnectionParam
+from common.circuit_breaker import CircuitBreaker
+from common.http_client import ProviderSession, DEFAULT_TIMEOUT
 
 # -----------------------------------------------------#
 # Copy the code below and ignore the libraries above
 # -----------------------------------------------------#
 
 import requests
+import hashlib
+import threading
+import time
 from datetime import datetime
-from requests.auth import HTTPBasicAuth
+from requests.auth import AuthBase, HTTPBasicAuth
+from types import MappingProxyType
 
 ### Connection Parameters
 USERNAME = ConnectionParam(
@@ -24,20 +30,154 @@ BASE_URL = ConnectionParam(
     description="Splunk Base URL",
     input_type=InputType.TEXT,
 )
+AUTH_MODE = ConnectionParam(
+    "AUTH_MODE",
+    description="'basic' to send the password on every request (default) or 'session' to log in once and reuse a Splunk session key",
+    input_type=InputType.TEXT,
+    optional=True,
+)
 ### End of Connection Parameters
 
+# Cached session keys are dropped after this many idle seconds, comfortably
+# below Splunk's default one hour session timeout
+SESSION_IDLE_EXPIRY = 45 * 60
+
+# Successful test_authentication results are reused for this many seconds
+AUTH_PROBE_TTL = 60
+
+# (base_url, username, password digest) -> [session_key, last_used]
+_session_keys = {}
+_session_keys_lock = threading.Lock()
+# Same key -> lock held while logging in, so one slow search head only
+# blocks its own connections and concurrent 401s share one re-login
+_login_locks = {}
+# (base_url, username, password digest, auth_mode) -> last success time
+_auth_probe_results = {}
+
+
+class SplunkSessionAuth(AuthBase):
+    """
+    Log in once through /services/auth/login and send the cached session key
+    as `Authorization: Splunk <key>`. A 401 triggers one re-login and retry.
+    The login goes through `session`, so it shares its deadline, breaker and
+    cassette.
+    """
+
+    def __init__(self, base_url, username, password, session):
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.session = session
+        self.cache_key = (
+            base_url,
+            username,
+            hashlib.sha256(str(password).encode()).hexdigest(),
+        )
+
+    def _login(self):
+        response = self.session.post(
+            f"{self.base_url}/services/auth/login",
+            data={
+                "username": self.username,
+                "password": self.password,
+                "output_mode": "json",
+            },
+            verify=False,
+        )
+        response.raise_for_status()
+        return response.json()["sessionKey"]
+
+    def _cached_session_key(self, rejected_key):
+        now = time.time()
+        with _session_keys_lock:
+            cached = _session_keys.get(self.cache_key)
+            if (
+                cached is not None
+                and cached[0] != rejected_key
+                and now - cached[1] < SESSION_IDLE_EXPIRY
+            ):
+                cached[1] = now
+                return cached[0]
+            return None
+
+    def get_session_key(self, rejected_key=None):
+        """
+        Return the cached session key, logging in when there is none. A key
+        Splunk rejected is replaced only if no other thread already did.
+        """
+        session_key = self._cached_session_key(rejected_key)
+        if session_key is not None:
+            return session_key
+
+        with _session_keys_lock:
+            login_lock = _login_locks.setdefault(
+                self.cache_key, threading.Lock()
+            )
+        with login_lock:
+            session_key = self._cached_session_key(rejected_key)
+            if session_key is not None:
+                return session_key
+            session_key = self._login()
+            with _session_keys_lock:
+                _session_keys[self.cache_key] = [session_key, time.time()]
+            return session_key
+
+    def _retry_on_401(self, response, **kwargs):
+        if response.status_code != 401:
+            return response
+
+        # Consume the body so the connection can be reused for the retry
+        response.content
+        response.close()
+        retry = response.request.copy()
+        retry.hooks = {
+            "response": [
+                hook
+                for hook in retry.hooks.get("response", [])
+                if hook != self._retry_on_401
+            ]
+        }
+        rejected_key = response.request.headers.get("Authorization", "")[
+            len("Splunk ") :
+        ]
+        retry.headers[
+            "Authorization"
+        ] = f"Splunk {self.get_session_key(rejected_key=rejected_key)}"
+        retried = response.connection.send(retry, **kwargs)
+        retried.history.append(response)
+        retried.request = retry
+        return retried
+
+    def __call__(self, request):
+        request.headers["Authorization"] = f"Splunk {self.get_session_key()}"
+        request.register_hook("response", self._retry_on_401)
+        return request
+
 
 class SplunkAuthentication:
     def __init__(self, auth_params):
         self.username = USERNAME.read_value(auth_params)
         self.password = PASSWORD.read_value(auth_params)
         self.base_url = BASE_URL.read_value(auth_params)
-        self.auth = HTTPBasicAuth(self.username, self.password)
+        self.auth_mode = AUTH_MODE.read_value(auth_params) or "basic"
+        self.breaker = CircuitBreaker()
+        self.session = ProviderSession(breaker=self.breaker)
+        if self.auth_mode == "session":
+            self.auth = SplunkSessionAuth(
+                self.base_url, self.username, self.password, self.session
+            )
+        elif self.auth_mode == "basic":
+            self.auth = HTTPBasicAuth(self.username, self.password)
+        else:
+            raise ValueError(f"Unsupported AUTH_MODE: {self.auth_mode}")
+        self.headers = MappingProxyType(
+            {
+                "Content-Type": "application/x-www-form-urlencoded",
+            }
+        )
 
     def get_headers(self):
-        return {
-            "Content-Type": "application/x-www-form-urlencoded",
-        }
+        return self.headers
 
     def format_time(self, dt: datetime) -> str:
         """Format the datetime object to RFC 3339 compliant string"""
@@ -49,34 +189,43 @@ def test_authentication(auth_params):  # must have function
     try:
         integration = SplunkAuthentication(auth_params)
 
-        # Simple test query
-        test_query = "search index=_internal | head 5"
-
-        payload = {
-            "search": test_query,
-        }
+        cache_key = (
+            integration.base_url,
+            integration.username,
+            hashlib.sha256(str(integration.password).encode()).hexdigest(),
+            integration.auth_mode,
+        )
+        verified_at = _auth_probe_results.get(cache_key)
+        if (
+            verified_at is not None
+            and time.time() - verified_at < AUTH_PROBE_TTL
+        ):
+            return 200
 
-        search_url = f"{integration.base_url}/services/search/v2/jobs"
+        # Cheap authenticated endpoint, no search job is dispatched
+        context_url = (
+            f"{integration.base_url}/services/authentication/current-context"
+        )
 
-        # Attempt to start a search job
-        response = requests.post(
-            search_url,
+        response = integration.session.get(
+            context_url,
             headers=integration.get_headers(),
             auth=integration.auth,
-            data=payload,
+            params={"output_mode": "json"},
             verify=False,
+            timeout=DEFAULT_TIMEOUT,
         )
 
-        if response.status_code in [
-            201,
-            200,
-        ]:  # Successfully started a search job
+        if response.status_code == 200:
+            # Only successes are cached: a failure may be transient or fixed
+            # on the Splunk side before the next check
+            _auth_probe_results[cache_key] = time.time()
             return 200
-        else:
-            print(
-                f"Failed to verify authentication with Splunk: {response.status_code}, {response.text}"
-            )
-            return 401
+        _auth_probe_results.pop(cache_key, None)
+        print(
+            f"Failed to verify authentication with Splunk: {response.status_code}, {response.text}"
+        )
+        return 401
     except ValueError as e:
         print(f"Missing required parameter: {str(e)}")
         return 400
@@ -1,14 +1,49 @@
 from .authentication import SplunkAuthentication
-from common.types import InputType, InputParameter, DataType, OutputParameter
+from common.types import (
+    InputType,
+    InputParameter,
+    DataType,
+    OutputParameter,
+    compile_outputs,
+)
+from common.registry import (
+    get_provider,
+    invalidate_provider,
+    is_auth_failure,
+)
+from common.deadline import (
+    DeadlineExceeded,
+    DEADLINE_EXCEEDED_STATUS,
+    propagate,
+    sleep as deadline_sleep,
+    with_deadline,
+)
+from common.circuit_breaker import CircuitOpenError, CIRCUIT_OPEN_STATUS
+from common.batch import run_batch
+from common.memo import side_effects
+from common.streaming import page_chunk, error_chunk
+from common.large_output import (
+    collect_records,
+    read_records,
+    spill_if_large,
+)
+from common.poller import BackgroundPoller
+from common.columnar import encode_columnar
+from common.json_stream import iter_json_items, read_json_items
 
 # -----------------------------------------------------#
 # Copy the code below and ignore the libraries above
 # -----------------------------------------------------#
 
-import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from itertools import islice
+from urllib.parse import quote
+import hashlib
+import math
+import re
 import time
-import random
 
 ### Input Parameters
 INSTANCE = InputParameter(
@@ -36,7 +71,91 @@ END_TIME = InputParameter(
 )
 MAX_COUNT = InputParameter(
     "MAX_COUNT",
-    description="Maximum number of results to retrieve",
+    description="Maximum number of results to retrieve (with SAVED_SEARCH, caps the rows read from its run)",
+    data_type=DataType.INT,
+    optional=True,
+)
+SPILL_THRESHOLD = InputParameter(
+    "SPILL_THRESHOLD",
+    description="Result size in bytes above which results are written to an NDJSON file and a file handle is returned instead (unset or 0 keeps results inline)",
+    data_type=DataType.INT,
+    optional=True,
+)
+OUTPUT_FORMAT = InputParameter(
+    "OUTPUT_FORMAT",
+    description="Format of the returned results: 'rows' (default) or 'columnar' (one fields list and per-column arrays)",
+    data_type=DataType.STRING,
+    optional=True,
+)
+COMPRESS = InputParameter(
+    "COMPRESS",
+    description="Compress columnar results with zlib (base64 encoded)",
+    data_type=DataType.BOOL,
+    optional=True,
+)
+PARALLEL_FETCHES = InputParameter(
+    "PARALLEL_FETCHES",
+    description="Number of concurrent requests used to download the results of a completed search (default 1)",
+    data_type=DataType.INT,
+    optional=True,
+)
+REUSE_TTL = InputParameter(
+    "REUSE_TTL",
+    description="Seconds for which a finished identical search is reused instead of dispatching a new one (default 300, 0 disables)",
+    data_type=DataType.INT,
+    optional=True,
+)
+SHARDS = InputParameter(
+    "SHARDS",
+    description="Split the time range into this many sub-ranges searched as concurrent jobs whose rows are concatenated (default 1, 'sync' mode only; rejected with MODE 'submit' and for queries using commands that aggregate, sort or dedup across events such as stats, timechart, top or dedup)",
+    data_type=DataType.INT,
+    optional=True,
+)
+SHARD_CONCURRENCY = InputParameter(
+    "SHARD_CONCURRENCY",
+    description="Maximum number of shard search jobs running at the same time (default 4)",
+    data_type=DataType.INT,
+    optional=True,
+)
+MODE = InputParameter(
+    "MODE",
+    description="'sync' (default) waits for the results, 'submit' dispatches the search and returns its sid, 'collect' returns the results of SID once the job is done",
+    data_type=DataType.STRING,
+    optional=True,
+)
+SID = InputParameter(
+    "SID",
+    description="Search id returned by a 'submit' call, used with MODE 'collect'",
+    data_type=DataType.STRING,
+    optional=True,
+)
+SAVED_SEARCH = InputParameter(
+    "SAVED_SEARCH",
+    description="Name of a scheduled saved search to read results from instead of QUERY; its latest scheduled run is returned when fresh, otherwise the saved search is dispatched (START_TIME and END_TIME are ignored)",
+    data_type=DataType.STRING,
+    optional=True,
+)
+SAVED_SEARCH_OWNER = InputParameter(
+    "SAVED_SEARCH_OWNER",
+    description="Owner of SAVED_SEARCH (default '-', any owner visible to the connection's user)",
+    data_type=DataType.STRING,
+    optional=True,
+)
+SAVED_SEARCH_APP = InputParameter(
+    "SAVED_SEARCH_APP",
+    description="App of SAVED_SEARCH (default '-', any app; set it when several apps define a saved search with that name)",
+    data_type=DataType.STRING,
+    optional=True,
+)
+SAVED_SEARCH_MAX_AGE = InputParameter(
+    "SAVED_SEARCH_MAX_AGE",
+    description="Maximum age in seconds of a scheduled saved-search run whose results are reused (default 900)",
+    data_type=DataType.INT,
+    optional=True,
+)
+TIMEOUT = InputParameter(
+    "TIMEOUT",
+    description="Total time budget in seconds for the skill run; every request and poll is bounded by what is left (default 3600)",
     data_type=DataType.INT,
     optional=True,
 )
@@ -46,7 +165,7 @@ MAX_COUNT = InputParameter(
 STATUS = OutputParameter(
     name="STATUS",
     description="Status of the skill execution",
-    data_type=DataType.STRING,
+    data_type=DataType.INT,
 )
 RESULTS = OutputParameter(
     name="RESULTS",
@@ -55,40 +174,270 @@ RESULTS = OutputParameter(
 )
 ### End of Output Parameters
 
+# Coerces the outputs of every result to their declared types
+OUTPUTS = compile_outputs(STATUS, RESULTS)
 
-def run_skill(input_params, auth_params):
+# Time budget of a run_skill call unless TIMEOUT is set
+DEFAULT_TIMEOUT_BUDGET = 60 * 60
+
+# Items of a run_skill_batch call executed at the same time
+BATCH_CONCURRENCY = 4
+
+# Finished identical searches younger than this are read back, not re-run
+DEFAULT_REUSE_TTL = 5 * 60
+# Scheduled saved-search runs younger than this are returned as is
+DEFAULT_SAVED_SEARCH_MAX_AGE = 15 * 60
+# Shard search jobs allowed to run at once unless SHARD_CONCURRENCY is set
+DEFAULT_SHARD_CONCURRENCY = 4
+# STATUS of submit calls and of collect calls whose job is still running
+PENDING_STATUS = 202
+# Splunk returns at most this many rows per results request (maxresultrows)
+RESULTS_PAGE_LIMIT = 50000
+# Rows per chunk yielded by run_skill_stream
+STREAM_PAGE_SIZE = 5000
+# SPL commands whose output depends on every event of the search, so
+# per-shard results cannot simply be concatenated
+CROSS_EVENT_COMMANDS = (
+    "stats",
+    "chart",
+    "timechart",
+    "top",
+    "rare",
+    "dedup",
+    "eventstats",
+    "streamstats",
+    "transaction",
+    "sort",
+    "head",
+    "tail",
+    "uniq",
+    "tstats",
+    "geostats",
+    "sistats",
+    "sichart",
+    "sitimechart",
+    "sitop",
+    "sirare",
+    "contingency",
+    "xyseries",
+    "join",
+    "append",
+    "appendpipe",
+)
+_CROSS_EVENT_COMMAND = re.compile(
+    r"\|\s*(?:" + "|".join(CROSS_EVENT_COMMANDS) + r")\b", re.IGNORECASE
+)
+
+
+def _job_id(username, search, earliest, latest, max_count, generation):
     """
-    This will be called to run the skill.
-    Executes a Splunk search query and returns the results.
+    Derive the search id from the search so identical searches share it.
+    `generation` changes once per reuse window, so a stale job is replaced
+    by a new sid instead of being deleted under callers still reading it.
     """
-    integration = SplunkAuthentication(auth_params)
-    ## Logic Starts Here
+    key = "\x1f".join(
+        str(part)
+        for part in (
+            username,
+            search,
+            earliest,
+            latest,
+            max_count,
+            generation,
+        )
+    )
+    return f"sid_{hashlib.sha256(key.encode()).hexdigest()[:32]}"
+
+
+def _get_job(integration, job_id):
+    """Return the job entry, or None if Splunk does not know the job"""
+    status_url = f"{integration.base_url}/servicesNS/{integration.username}/search/search/jobs/{job_id}"
+
+    resp_job_status = integration.session.get(
+        status_url,
+        auth=integration.auth,
+        headers=integration.get_headers(),
+        params={"output_mode": "json"},
+        verify=False,
+    )
+    if resp_job_status.status_code == 404:
+        return None
+    resp_job_status.raise_for_status()
+    return resp_job_status.json()["entry"][0]
+
+
+def _age(entry):
+    """Seconds since a job or artifact entry was published, None if unknown"""
     try:
-        # Get input parameters
-        query = QUERY.read_value(input_params)
-        start_time = START_TIME.read_value(input_params)
-        end_time = END_TIME.read_value(input_params)
-        max_count = MAX_COUNT.read_value(input_params)
+        published = datetime.fromisoformat(entry["published"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return time.time() - published.timestamp()
 
-        # Set default times if not provided
-        if not start_time:
-            start_time = int(time.time()) - (5 * 60)  # 5 minutes ago
-        if not end_time:
-            end_time = int(time.time())  # current time
 
-        # Step 1: Start the search job
-        search_query = f"search {query}"
-        api_start_time = time.time()
+def _is_reusable(job_entry, reuse_ttl):
+    """A running job is always joined, a finished one only while fresh"""
+    state = job_entry["content"]["dispatchState"]
+    if state == "FAILED":
+        return False
+    if state != "DONE":
+        return True
+    age = _age(job_entry)
+    return age is not None and age <= reuse_ttl
+
 
+def _iter_result_slices(
+    integration, job_id, result_count, parallel_fetches, envelope
+):
+    """
+    Yield the rows of a completed job in order, read in offset/count slices
+    of which up to `parallel_fetches` download concurrently. Only those
+    slices are held in memory at once. The fields of the first slice other
+    than its rows are copied into the `envelope` dict.
+    """
+    results_url = f"{integration.base_url}/servicesNS/{integration.username}/search/search/jobs/{job_id}/results"
+    workers = max(parallel_fetches, 1)
+    slice_size = min(
+        max(math.ceil(result_count / workers), 1), RESULTS_PAGE_LIMIT
+    )
+    offsets = iter(range(0, max(result_count, 1), slice_size))
+
+    # Slices share the provider's pooled connections
+    integration.session.ensure_pool_size(workers)
+    headers = integration.get_headers()
+
+    def fetch_slice(offset):
+        response = integration.session.get(
+            results_url,
+            auth=integration.auth,
+            headers=headers,
+            verify=False,
+            params={
+                "output_mode": "json",
+                "offset": offset,
+                "count": min(slice_size, max(result_count - offset, 1)),
+            },
+            stream=True,
+        )
+        with response:
+            response.raise_for_status()
+            return read_json_items(response, "results")
+
+    fetch = propagate(fetch_slice)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque(
+            executor.submit(fetch, offset)
+            for offset in islice(offsets, workers)
+        )
+        while pending:
+            page = pending.popleft().result()
+            offset = next(offsets, None)
+            if offset is not None:
+                pending.append(executor.submit(fetch, offset))
+            if not envelope:
+                envelope.update(
+                    (k, v) for k, v in page.items() if k != "results"
+                )
+            yield from page.get("results", [])
+
+
+def _fetch_results(
+    integration,
+    job_id,
+    result_count,
+    parallel_fetches,
+    spill_threshold=0,
+    max_count=None,
+):
+    """
+    Download the results of a completed job, at most `max_count` rows when
+    set. Large result sets are split into offset/count slices fetched
+    concurrently and reassembled in order. Rows are decoded as they arrive
+    and spilled to disk past `spill_threshold` (see
+    common.large_output.read_records).
+    """
+    if max_count:
+        result_count = min(result_count, max_count)
+
+    if parallel_fetches <= 1 and result_count <= RESULTS_PAGE_LIMIT:
+        results_url = f"{integration.base_url}/servicesNS/{integration.username}/search/search/jobs/{job_id}/results"
+        results_response = integration.session.get(
+            results_url,
+            auth=integration.auth,
+            headers=integration.get_headers(),
+            params={
+                "output_mode": "json",
+                "count": result_count if max_count else 0,
+            },
+            verify=False,
+            stream=True,
+        )
+        with results_response:
+            results_response.raise_for_status()
+            return results_response.status_code, read_records(
+                results_response, "results", threshold=spill_threshold
+            )
+
+    envelope = {}
+    rows = _iter_result_slices(
+        integration, job_id, result_count, parallel_fetches, envelope
+    )
+    return 200, collect_records(
+        rows, "results", lambda: envelope, threshold=spill_threshold
+    )
+
+
+def _submit_job(
+    integration, search_query, start_time, end_time, max_count, reuse_ttl
+):
+    """
+    Dispatch one search job, or reuse an identical one, without waiting.
+    Returns the sid and the job entry when an existing job was reused.
+    """
+    earliest_time = integration.format_time(
+        datetime.fromtimestamp(start_time, tz=timezone.utc)
+    )
+    latest_time = integration.format_time(
+        datetime.fromtimestamp(end_time, tz=timezone.utc)
+    )
+
+    def job_id_for(generation):
+        return _job_id(
+            integration.username,
+            search_query,
+            earliest_time,
+            latest_time,
+            max_count,
+            generation,
+        )
+
+    # Join a running identical search or reuse a fresh finished one from
+    # this reuse window or the previous one
+    job_entry = None
+    if reuse_ttl > 0:
+        generation = int(time.time() // reuse_ttl)
+        for candidate in (generation, generation - 1):
+            job_id = job_id_for(candidate)
+            candidate_entry = _get_job(integration, job_id)
+            if candidate_entry is not None and _is_reusable(
+                candidate_entry, reuse_ttl
+            ):
+                job_entry = candidate_entry
+                break
+            if candidate == generation and candidate_entry is not None:
+                # This window's job failed: retry under a sid of our own
+                generation = f"{generation}-{time.time_ns()}"
+        else:
+            job_id = job_id_for(generation)
+    else:
+        job_id = job_id_for(time.time_ns())
+
+    if job_entry is None:
         data = {
             "search": search_query,
-            "id": f"sid{random.randint(100000, 999999)}",
-            "earliest_time": integration.format_time(
-                datetime.fromtimestamp(start_time, tz=timezone.utc)
-            ),
-            "latest_time": integration.format_time(
-                datetime.fromtimestamp(end_time, tz=timezone.utc)
-            ),
+            "id": job_id,
+            "earliest_time": earliest_time,
+            "latest_time": latest_time,
             "max_count": max_count,
             "output_mode": "json",
         }
@@ -96,66 +445,646 @@ def run_skill(input_params, auth_params):
         search_url = f"{integration.base_url}/servicesNS/{integration.username}/search/search/jobs"
 
         # Start the search job
-        response = requests.post(
+        response = integration.session.post(
             search_url,
             auth=integration.auth,
             data=data,
             headers=integration.get_headers(),
             verify=False,
         )
-        response.raise_for_status()
+        if not response.ok:
+            # Another worker may have dispatched the same search first
+            job_entry = _get_job(integration, job_id)
+            if job_entry is None:
+                response.raise_for_status()
 
-        job_id = response.json().get("sid")
+    return job_id, job_entry
 
-        # Step 2: Poll the search job status
-        time_limit = 60 * 60  # 1 hour
-        while True:
-            if time.time() - api_start_time > time_limit:
-                raise Exception("Search job exceeded time limit of 60 minutes")
 
-            time.sleep(2)  # 2 seconds wait before checking status
+def _wait_for_job(
+    integration, search_query, start_time, end_time, max_count, reuse_ttl
+):
+    """Dispatch (or reuse) one search job and wait until it is done"""
+    # Step 1: Start the search job
+    job_id, job_entry = _submit_job(
+        integration, search_query, start_time, end_time, max_count, reuse_ttl
+    )
 
-            status_url = f"{integration.base_url}/servicesNS/{integration.username}/search/search/jobs/{job_id}"
+    # Step 2: Poll the search job status
+    return job_id, _poll_job(integration, job_id, job_entry)
 
-            resp_job_status = requests.get(
-                status_url,
-                auth=integration.auth,
-                headers=integration.get_headers(),
-                params={"output_mode": "json"},
-                verify=False,
-            )
-            resp_job_status.raise_for_status()
 
-            is_job_completed = resp_job_status.json()["entry"][0]["content"][
-                "dispatchState"
-            ]
+def _poll_job(integration, job_id, job_entry=None):
+    """Wait until the job is done and return its content"""
+    api_start_time = time.time()
+    time_limit = 60 * 60  # 1 hour
+    while True:
+        if job_entry is not None:
+            job_content = job_entry["content"]
+            is_job_completed = job_content["dispatchState"]
 
             if is_job_completed == "DONE":
                 break
             elif is_job_completed == "FAILED":
                 raise Exception("Search job failed")
 
-        # Step 3: Retrieve the search results
-        results_url = f"{integration.base_url}/servicesNS/{integration.username}/search/search/jobs/{job_id}/results"
+        if time.time() - api_start_time > time_limit:
+            raise Exception("Search job exceeded time limit of 60 minutes")
 
-        results_response = requests.get(
-            results_url,
+        deadline_sleep(2)  # 2 seconds wait before checking status
+
+        job_entry = _get_job(integration, job_id)
+
+    return job_content
+
+
+def _saved_search_url(integration, saved_search, namespace):
+    owner, app = (quote(part, safe="") for part in namespace)
+    return f"{integration.base_url}/servicesNS/{owner}/{app}/saved/searches/{quote(saved_search, safe='')}"
+
+
+def _saved_search_namespace(input_params):
+    """(owner, app) of SAVED_SEARCH, '-' matching any"""
+    return (
+        SAVED_SEARCH_OWNER.read_value(input_params) or "-",
+        SAVED_SEARCH_APP.read_value(input_params) or "-",
+    )
+
+
+def _dispatch_namespace(integration, saved_search, namespace):
+    """
+    Namespace to dispatch a saved search in: Splunk only dispatches under a
+    concrete owner and app, so a wildcard app is taken from the saved
+    search's ACL and a wildcard owner becomes the connection's user.
+    """
+    owner, app = namespace
+    if app == "-":
+        response = integration.session.get(
+            _saved_search_url(integration, saved_search, namespace),
             auth=integration.auth,
             headers=integration.get_headers(),
-            data={"output_mode": "json"},
+            params={"output_mode": "json"},
             verify=False,
         )
-        results_response.raise_for_status()
+        if response.status_code == 404:
+            raise ValueError(f"Unknown saved search: {saved_search}")
+        response.raise_for_status()
+        apps = {
+            entry["acl"]["app"] for entry in response.json().get("entry", [])
+        }
+        if not apps:
+            raise ValueError(f"Unknown saved search: {saved_search}")
+        if len(apps) > 1:
+            raise ValueError(
+                f"Saved search {saved_search} exists in several apps "
+                f"({', '.join(sorted(apps))}), set SAVED_SEARCH_APP"
+            )
+        app = apps.pop()
+    if owner == "-":
+        owner = integration.username
+    return owner, app
+
+
+def _latest_scheduled_artifact(integration, saved_search, namespace):
+    """Newest successful scheduled run of a saved search, or None"""
+    history_url = (
+        f"{_saved_search_url(integration, saved_search, namespace)}/history"
+    )
+
+    response = integration.session.get(
+        history_url,
+        auth=integration.auth,
+        headers=integration.get_headers(),
+        params={"output_mode": "json", "count": 0},
+        verify=False,
+    )
+    if response.status_code == 404:
+        raise ValueError(f"Unknown saved search: {saved_search}")
+    response.raise_for_status()
+
+    artifacts = [
+        entry
+        for entry in response.json().get("entry", [])
+        if entry.get("content", {}).get("isScheduled")
+        and entry["content"].get("isDone")
+        and not entry["content"].get("isFailed")
+        and _age(entry) is not None
+    ]
+    return min(artifacts, key=_age, default=None)
+
+
+def _saved_search_job(integration, saved_search, max_age, namespace):
+    """
+    Return the sid of the saved search's latest scheduled run if it is at
+    most `max_age` seconds old, otherwise dispatch the saved search now.
+    `namespace` is the (owner, app) the saved search is looked up in.
+    """
+    artifact = _latest_scheduled_artifact(
+        integration, saved_search, namespace
+    )
+    if artifact is not None and _age(artifact) <= max_age:
+        return artifact["name"]
+
+    dispatch_namespace = _dispatch_namespace(
+        integration, saved_search, namespace
+    )
+    response = integration.session.post(
+        f"{_saved_search_url(integration, saved_search, dispatch_namespace)}/dispatch",
+        auth=integration.auth,
+        data={"output_mode": "json"},
+        headers=integration.get_headers(),
+        verify=False,
+    )
+    response.raise_for_status()
+    return response.json()["sid"]
+
+
+def _run_search(
+    integration,
+    search_query,
+    start_time,
+    end_time,
+    max_count,
+    reuse_ttl,
+    parallel_fetches,
+    spill_threshold=0,
+):
+    """Run one search job and fetch its results"""
+    job_id, job_content = _wait_for_job(
+        integration, search_query, start_time, end_time, max_count, reuse_ttl
+    )
+
+    # Step 3: Retrieve the search results
+    return _fetch_results(
+        integration,
+        job_id,
+        int(job_content.get("resultCount", 0)),
+        parallel_fetches,
+        spill_threshold,
+    )
+
+
+def _run_saved_search(
+    integration,
+    saved_search,
+    max_age,
+    namespace,
+    parallel_fetches,
+    spill_threshold=0,
+    max_count=None,
+):
+    """
+    Fetch the results of a fresh scheduled run or of a new dispatch. The
+    run's search is fixed, so `max_count` only caps the rows downloaded.
+    """
+    job_id = _saved_search_job(integration, saved_search, max_age, namespace)
+    # A scheduled run is usually done already: check it before sleeping
+    job_content = _poll_job(
+        integration, job_id, _get_job(integration, job_id)
+    )
+    return _fetch_results(
+        integration,
+        job_id,
+        int(job_content.get("resultCount", 0)),
+        parallel_fetches,
+        spill_threshold,
+        max_count,
+    )
+
+
+def _shard_window(start_time, end_time, shards):
+    """Split [start_time, end_time) into up to `shards` ranges, newest first"""
+    start_time, end_time = int(start_time), int(end_time)
+    width = max(math.ceil((end_time - start_time) / shards), 1)
+    windows = []
+    shard_start = start_time
+    while shard_start < end_time:
+        windows.append((shard_start, min(shard_start + width, end_time)))
+        shard_start += width
+    return list(reversed(windows)) or [(start_time, end_time)]
+
+
+def _run_sharded_search(
+    integration,
+    search_query,
+    start_time,
+    end_time,
+    max_count,
+    reuse_ttl,
+    parallel_fetches,
+    shards,
+    shard_concurrency,
+    spill_threshold=0,
+):
+    """
+    Run one search job per time shard, at most `shard_concurrency` at a time,
+    and merge the results newest shard first so they stay in time order.
+    Only valid for queries whose rows do not depend on other events (see
+    CROSS_EVENT_COMMANDS). Each shard is downloaded once it and the newer ones are done, spilling
+    to disk past `spill_threshold` as rows arrive.
+    """
+
+    def run_shard(window):
+        return _wait_for_job(
+            integration,
+            search_query,
+            window[0],
+            window[1],
+            max_count,
+            reuse_ttl,
+        )
+
+    windows = _shard_window(start_time, end_time, shards)
+    envelope = {}
+
+    def rows():
+        with ThreadPoolExecutor(max_workers=shard_concurrency) as executor:
+            for job_id, job_content in executor.map(
+                propagate(run_shard), windows
+            ):
+                yield from _iter_result_slices(
+                    integration,
+                    job_id,
+                    int(job_content.get("resultCount", 0)),
+                    parallel_fetches,
+                    envelope,
+                )
+
+    results = rows()
+    try:
+        return 200, collect_records(
+            islice(results, max_count) if max_count else results,
+            "results",
+            lambda: envelope,
+            threshold=spill_threshold,
+        )
+    finally:
+        # Stop downloading once MAX_COUNT rows are in
+        results.close()
+
+
+@OUTPUTS
+@side_effects
+@with_deadline(TIMEOUT, DEFAULT_TIMEOUT_BUDGET, RESULTS)
+def run_skill(input_params, auth_params):
+    """
+    This will be called to run the skill.
+    Executes a Splunk search query and returns the results.
+    """
+    integration = get_provider(SplunkAuthentication, auth_params)
+    ## Logic Starts Here
+    try:
+        # Get input parameters
+        query = QUERY.read_value(input_params)
+        start_time = START_TIME.read_value(input_params)
+        end_time = END_TIME.read_value(input_params)
+        max_count = MAX_COUNT.read_value(input_params)
+        spill_threshold = SPILL_THRESHOLD.read_value(input_params)
+        parallel_fetches = PARALLEL_FETCHES.read_value(input_params) or 1
+        reuse_ttl = REUSE_TTL.read_value(input_params)
+        if reuse_ttl is None:
+            reuse_ttl = DEFAULT_REUSE_TTL
+        shards = SHARDS.read_value(input_params) or 1
+        shard_concurrency = (
+            SHARD_CONCURRENCY.read_value(input_params)
+            or DEFAULT_SHARD_CONCURRENCY
+        )
+        mode = MODE.read_value(input_params) or "sync"
+        if mode not in ("sync", "submit", "collect"):
+            raise ValueError(f"Unsupported MODE: {mode}")
+        saved_search = SAVED_SEARCH.read_value(input_params)
+        saved_search_max_age = SAVED_SEARCH_MAX_AGE.read_value(input_params)
+        if saved_search_max_age is None:
+            saved_search_max_age = DEFAULT_SAVED_SEARCH_MAX_AGE
+        output_format = OUTPUT_FORMAT.read_value(input_params) or "rows"
+        if output_format not in ("rows", "columnar"):
+            raise ValueError(f"Unsupported OUTPUT_FORMAT: {output_format}")
+        # Columnar encoding needs every row in memory, so only row output
+        # is spilled while it downloads
+        fetch_spill_threshold = (
+            spill_threshold if output_format == "rows" else 0
+        )
+
+        # Set default times if not provided
+        if not start_time:
+            start_time = int(time.time()) - (5 * 60)  # 5 minutes ago
+        if not end_time:
+            end_time = int(time.time())  # current time
+
+        search_query = f"search {query}"
+
+        if mode == "submit" and shards > 1 and not saved_search:
+            raise ValueError("SHARDS is not supported when MODE is 'submit'")
+        if (
+            shards > 1
+            and not saved_search
+            and _CROSS_EVENT_COMMAND.search(search_query)
+        ):
+            raise ValueError(
+                "SHARDS is not supported for queries that aggregate, sort "
+                "or dedup across events"
+            )
+
+        if mode == "submit" and saved_search:
+            job_id = _saved_search_job(
+                integration,
+                saved_search,
+                saved_search_max_age,
+                _saved_search_namespace(input_params),
+            )
+            job_entry = _get_job(integration, job_id)
+            return {
+                "STATUS": PENDING_STATUS,
+                "RESULTS": {
+                    "sid": job_id,
+                    "dispatchState": (
+                        job_entry["content"]["dispatchState"]
+                        if job_entry is not None
+                        else "QUEUED"
+                    ),
+                },
+            }
+
+        if mode == "submit":
+            job_id, job_entry = _submit_job(
+                integration,
+                search_query,
+                start_time,
+                end_time,
+                max_count,
+                reuse_ttl,
+            )
+            return {
+                "STATUS": PENDING_STATUS,
+                "RESULTS": {
+                    "sid": job_id,
+                    "dispatchState": (
+                        job_entry["content"]["dispatchState"]
+                        if job_entry is not None
+                        else "QUEUED"
+                    ),
+                },
+            }
+
+        if mode == "collect":
+            job_id = SID.read_value(input_params)
+            if not job_id:
+                raise ValueError("SID is required when MODE is 'collect'")
+            job_entry = _get_job(integration, job_id)
+            if job_entry is None:
+                raise ValueError(f"Unknown or expired search job: {job_id}")
+            job_content = job_entry["content"]
+            if job_content["dispatchState"] == "FAILED":
+                raise Exception("Search job failed")
+            if job_content["dispatchState"] != "DONE":
+                return {
+                    "STATUS": PENDING_STATUS,
+                    "RESULTS": {
+                        "sid": job_id,
+                        "dispatchState": job_content["dispatchState"],
+                        "doneProgress": job_content.get("doneProgress"),
+                    },
+                }
+            status_code, results_json = _fetch_results(
+                integration,
+                job_id,
+                int(job_content.get("resultCount", 0)),
+                parallel_fetches,
+                fetch_spill_threshold,
+                max_count,
+            )
+        elif saved_search:
+            status_code, results_json = _run_saved_search(
+                integration,
+                saved_search,
+                saved_search_max_age,
+                _saved_search_namespace(input_params),
+                parallel_fetches,
+                fetch_spill_threshold,
+                max_count,
+            )
+        elif shards > 1:
+            status_code, results_json = _run_sharded_search(
+                integration,
+                search_query,
+                start_time,
+                end_time,
+                max_count,
+                reuse_ttl,
+                parallel_fetches,
+                shards,
+                shard_concurrency,
+                fetch_spill_threshold,
+            )
+        else:
+            status_code, results_json = _run_search(
+                integration,
+                search_query,
+                start_time,
+                end_time,
+                max_count,
+                reuse_ttl,
+                parallel_fetches,
+                fetch_spill_threshold,
+            )
 
-        results_json = results_response.json()
+        if output_format == "columnar":
+            results_json["results"] = encode_columnar(
+                results_json.get("results", []),
+                fields=[
+                    field["name"] if isinstance(field, dict) else field
+                    for field in results_json.get("fields", [])
+                ],
+                compress=bool(COMPRESS.read_value(input_params)),
+            )
 
         return {
-            "STATUS": results_response.status_code,
-            "RESULTS": results_json,
+            "STATUS": status_code,
+            "RESULTS": spill_if_large(
+                results_json, "results", threshold=spill_threshold
+            ),
+        }
+    except CircuitOpenError as e:
+        return {
+            "STATUS": CIRCUIT_OPEN_STATUS,
+            "RESULTS": str(e),
+        }
+    except DeadlineExceeded as e:
+        return {
+            "STATUS": DEADLINE_EXCEEDED_STATUS,
+            "RESULTS": str(e),
         }
     except Exception as e:
+        if is_auth_failure(e):
+            # Rejected credentials: build a fresh provider on the next call
+            invalidate_provider(SplunkAuthentication, auth_params)
         return {
             "STATUS": 500,
             "RESULTS": str(e),
         }
     ## Logic Ends Here
+
+
+def run_skill_batch(list_of_input_params, auth_params):
+    """
+    Optional batch entry point. Executes one Splunk search per input_params
+    with one shared provider, session and token; results keep input order.
+    """
+    return run_batch(
+        lambda input_params: run_skill(input_params, auth_params),
+        list_of_input_params,
+        max_concurrency=BATCH_CONCURRENCY,
+    )
+
+
+_poller = BackgroundPoller(interval=2)
+
+
+def collect_when_ready(input_params, auth_params, callback, timeout=60 * 60):
+    """
+    Optional non-blocking collection for a submitted search. The shared
+    background poller reads the status of SID every 2 seconds; once the job
+    is finished its results are collected on the poller's worker pool and
+    passed to `callback(result)` as a run_skill style result.
+    """
+    job_id = SID.read_value(input_params)
+    if not job_id:
+        raise ValueError("SID is required to collect a search")
+    integration = get_provider(SplunkAuthentication, auth_params)
+    collect_params = {**input_params, MODE.name: "collect"}
+
+    def check():
+        job_entry = _get_job(integration, job_id)
+        if job_entry is None:
+            raise ValueError(f"Unknown or expired search job: {job_id}")
+        if job_entry["content"]["dispatchState"] in ("DONE", "FAILED"):
+            return job_entry
+        return None
+
+    def on_ready(job_entry):
+        callback(run_skill(collect_params, auth_params))
+
+    def on_error(error):
+        callback(OUTPUTS.coerce({"STATUS": 500, "RESULTS": str(error)}))
+
+    _poller.watch(check, on_ready, errback=on_error, timeout=timeout)
+
+
+@OUTPUTS
+@with_deadline(TIMEOUT, DEFAULT_TIMEOUT_BUDGET, RESULTS)
+def run_skill_stream(input_params, auth_params):
+    """
+    Optional streaming entry point. Runs the search like run_skill, then
+    downloads the results in streamed slices of up to RESULTS_PAGE_LIMIT
+    rows and yields them one page at a time with progress metadata while
+    the download is still running.
+    """
+    integration = get_provider(SplunkAuthentication, auth_params)
+    try:
+        query = QUERY.read_value(input_params)
+        start_time = START_TIME.read_value(input_params)
+        end_time = END_TIME.read_value(input_params)
+        max_count = MAX_COUNT.read_value(input_params)
+        reuse_ttl = REUSE_TTL.read_value(input_params)
+        if reuse_ttl is None:
+            reuse_ttl = DEFAULT_REUSE_TTL
+        saved_search = SAVED_SEARCH.read_value(input_params)
+        saved_search_max_age = SAVED_SEARCH_MAX_AGE.read_value(input_params)
+        if saved_search_max_age is None:
+            saved_search_max_age = DEFAULT_SAVED_SEARCH_MAX_AGE
+
+        if not start_time:
+            start_time = int(time.time()) - (5 * 60)  # 5 minutes ago
+        if not end_time:
+            end_time = int(time.time())  # current time
+
+        if saved_search:
+            job_id = _saved_search_job(
+                integration,
+                saved_search,
+                saved_search_max_age,
+                _saved_search_namespace(input_params),
+            )
+            job_content = _poll_job(
+                integration, job_id, _get_job(integration, job_id)
+            )
+        else:
+            job_id, job_content = _wait_for_job(
+                integration,
+                f"search {query}",
+                start_time,
+                end_time,
+                max_count,
+                reuse_ttl,
+            )
+        result_count = int(job_content.get("resultCount", 0))
+        if max_count:
+            # A saved search run is not limited by MAX_COUNT: cap the rows read
+            result_count = min(result_count, max_count)
+        results_url = f"{integration.base_url}/servicesNS/{integration.username}/search/search/jobs/{job_id}/results"
+
+        # Splunk caps a results request at RESULTS_PAGE_LIMIT rows, so the
+        # job is read in offset slices, each decoded while it downloads
+        headers = integration.get_headers()
+        returned = 0
+        page_number = 0
+        page = []
+        offset = 0
+        while True:
+            slice_count = RESULTS_PAGE_LIMIT
+            if result_count:
+                slice_count = min(slice_count, result_count - offset)
+            results_response = integration.session.get(
+                results_url,
+                auth=integration.auth,
+                headers=headers,
+                params={
+                    "output_mode": "json",
+                    "offset": offset,
+                    "count": slice_count,
+                },
+                verify=False,
+                stream=True,
+            )
+            in_slice = 0
+            with results_response:
+                results_response.raise_for_status()
+                for result in iter_json_items(results_response, "results"):
+                    in_slice += 1
+                    page.append(result)
+                    if len(page) < STREAM_PAGE_SIZE:
+                        continue
+                    returned += len(page)
+                    page_number += 1
+                    yield page_chunk(
+                        RESULTS.name,
+                        {"results": page},
+                        page_number,
+                        returned,
+                        total=result_count,
+                    )
+                    page = []
+            offset += in_slice
+            if in_slice < slice_count or (
+                result_count and offset >= result_count
+            ):
+                break
+
+        returned += len(page)
+        yield page_chunk(
+            RESULTS.name,
+            {"results": page},
+            page_number + 1,
+            returned,
+            total=result_count,
+            done=True,
+        )
+    except CircuitOpenError as e:
+        yield error_chunk(RESULTS.name, e, status=CIRCUIT_OPEN_STATUS)
+    except DeadlineExceeded as e:
+        yield error_chunk(RESULTS.name, e, status=DEADLINE_EXCEEDED_STATUS)
+    except Exception as e:
+        if is_auth_failure(e):
+            # Rejected credentials: build a fresh provider on the next call
+            invalidate_provider(SplunkAuthentication, auth_params)
+        yield error_chunk(RESULTS.name, e)
@@ -5,6 +5,15 @@ from common.types import InputType, ConnectionParam
 # -----------------------------------------------------#
 
 import requests
+import threading
+import time
+from types import MappingProxyType
+
+try:
+    # Shares tokens between processes when the runtime ships common/
+    from common.token_store import shared_token_store, token_key
+except ImportError:
+    shared_token_store = None
 
 
 ### Connection Parameters
@@ -30,6 +39,12 @@ SCOPE = ConnectionParam(
 )
 ### End of Connection Parameters
 
+# Seconds before an HTTP call to the provider is abandoned
+REQUEST_TIMEOUT = 30
+
+# Refresh tokens this many seconds before they expire
+TOKEN_EXPIRY_MARGIN = 60
+
 
 class MyIntegrationProvider:
     def __init__(self, auth_params):
@@ -38,14 +53,69 @@ class MyIntegrationProvider:
         self.client_secret = CLIENT_SECRET.read_value(auth_params)
         self.scope = SCOPE.read_value(auth_params)
         self.access_token = None
+        self.token_expires_at = 0
+        self.headers = None
+        self._token_lock = threading.Lock()
+        # Shared by every process on the host using these client credentials
+        self._token_key = None
+        if shared_token_store is not None:
+            self._token_key = token_key(
+                self.token_url, self.client_id, self.client_secret, self.scope
+            )
 
     def get_headers(self):
+        with self._token_lock:
+            if not self.access_token or time.time() >= self.token_expires_at:
+                if self._token_key is None:
+                    self._fetch_token()
+                else:
+                    self.access_token, self.token_expires_at = (
+                        shared_token_store().get_or_refresh(
+                            self._token_key, self._fetch_token
+                        )
+                    )
+                self.headers = MappingProxyType(
+                    {
+                        "Authorization": f"Bearer {self.access_token}",
+                        "Content-Type": "application/json",
+                    }
+                )
+            return self.headers
+
+    def invalidate_token(self, rejected_token):
+        """Forget a token the API rejected, unless it was already replaced"""
+        with self._token_lock:
+            if self.access_token == rejected_token:
+                self.access_token = None
+                self.headers = None
+        if self._token_key is not None:
+            shared_token_store().invalidate(self._token_key, rejected_token)
+
+    def request(self, method, url, **kwargs):
+        """
+        Call the API with the bearer token on top of any `headers` given,
+        refreshing the token and retrying once if the API answers 401
+        """
+        extra_headers = kwargs.pop("headers", None) or {}
+        kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+        for attempt in range(2):
+            headers = self.get_headers()
+            response = requests.request(
+                method, url, headers={**headers, **extra_headers}, **kwargs
+            )
+            if response.status_code != 401 or attempt:
+                return response
+            response.close()
+            self.invalidate_token(
+                headers["Authorization"][len("Bearer ") :]
+            )
+
+    def _fetch_token(self):
+        """Request a new token, returning (access_token, expires_at)"""
+        self._get_access_token()
         if not self.access_token:
-            self._get_access_token()
-        return {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json",
-        }
+            raise ValueError("Failed to obtain access token")
+        return self.access_token, self.token_expires_at
 
     def _get_access_token(self):
         payload = {
@@ -58,9 +128,22 @@ class MyIntegrationProvider:
             self.token_url,
             headers={"Content-Type": "application/json"},
             json=payload,
+            timeout=REQUEST_TIMEOUT,
         )
         if response.status_code >= 200 and response.status_code < 300:
-            self.access_token = response.json().get("access_token")
+            token = response.json()
+            self.access_token = token.get("access_token")
+            self.token_expires_at = (
+                time.time()
+                + int(token.get("expires_in", 3600))
+                - TOKEN_EXPIRY_MARGIN
+            )
+            self.headers = MappingProxyType(
+                {
+                    "Authorization": f"Bearer {self.access_token}",
+                    "Content-Type": "application/json",
+                }
+            )
 
 
 def test_authentication(auth_params):  # must have function
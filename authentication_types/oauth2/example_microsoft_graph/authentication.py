@@ -1,11 +1,17 @@
 from common.types import InputType, ConnectionParam
+from common.circuit_breaker import CircuitBreaker
+from common.http_client import make_session, DEFAULT_TIMEOUT
+from common.token_store import shared_token_store, token_key
 
 # -----------------------------------------------------#
 # Copy the code below and ignore the libraries above
 # -----------------------------------------------------#
 
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+from types import MappingProxyType
 import requests
+import threading
+import time
 
 
 ### Connection Parameters
@@ -24,8 +30,17 @@ TENANT_ID = ConnectionParam(
     description="Microsoft Azure Tenant ID",
     input_type=InputType.TEXT,
 )
+HTTP_TRANSPORT = ConnectionParam(
+    "HTTP_TRANSPORT",
+    description="'http1' (default) or 'http2' to multiplex concurrent requests over one connection",
+    input_type=InputType.TEXT,
+    optional=True,
+)
 ### End of Connection Parameters
 
+# Refresh tokens this many seconds before they expire
+TOKEN_EXPIRY_MARGIN = 60
+
 
 class MicrosoftGraphAuthentication:
     def __init__(self, auth_params):
@@ -37,20 +52,82 @@ class MicrosoftGraphAuthentication:
         self.auth_token_url = (
             f"{self.auth_url}/{self.tenant_id}/oauth2/v2.0/token"
         )
+        self.breaker = CircuitBreaker()
+        self.session = make_session(
+            HTTP_TRANSPORT.read_value(auth_params), breaker=self.breaker
+        )
         self.access_token = None
+        self.token_expires_at = 0
+        self.headers = None
+        self._token_lock = threading.Lock()
+        # Shared by every process on the host using this app registration
+        self._token_key = token_key(
+            self.auth_token_url, self.client_id, self.client_secret
+        )
 
     def get_headers(self):
         """Get headers with bearer token"""
-        if not self.access_token:
-            auth_response = self._get_graph_auth_token()
-            self.access_token = auth_response.get("access_token")
-            if not self.access_token:
-                raise ValueError("Failed to obtain bearer token")
-
-        return {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json",
-        }
+        with self._token_lock:
+            if not self.access_token or time.time() >= self.token_expires_at:
+                self.access_token, self.token_expires_at = (
+                    shared_token_store().get_or_refresh(
+                        self._token_key, self._fetch_token
+                    )
+                )
+                self.headers = MappingProxyType(
+                    {
+                        "Authorization": f"Bearer {self.access_token}",
+                        "Content-Type": "application/json",
+                    }
+                )
+
+            return self.headers
+
+    def invalidate_token(self, rejected_token: str) -> None:
+        """
+        Forget a token Graph answered 401 to, in this process and in the
+        shared store, unless another thread or process already replaced it.
+        """
+        with self._token_lock:
+            if self.access_token == rejected_token:
+                self.access_token = None
+                self.headers = None
+        shared_token_store().invalidate(self._token_key, rejected_token)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Call Graph with the bearer token on top of any `headers` given. A
+        401 means the token was revoked or rotated early: it is refreshed
+        and the call retried once.
+        """
+        extra_headers = kwargs.pop("headers", None) or {}
+        for attempt in range(2):
+            headers = self.get_headers()
+            response = self.session.request(
+                method, url, headers={**headers, **extra_headers}, **kwargs
+            )
+            if response.status_code != 401 or attempt:
+                return response
+            response.close()
+            self.invalidate_token(
+                headers["Authorization"][len("Bearer ") :]
+            )
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def _fetch_token(self) -> Tuple[str, float]:
+        """Request a new token, returning (access_token, expires_at)"""
+        auth_response = self._get_graph_auth_token()
+        access_token = auth_response.get("access_token")
+        if not access_token:
+            raise ValueError("Failed to obtain bearer token")
+        expires_at = (
+            time.time()
+            + int(auth_response.get("expires_in", 3600))
+            - TOKEN_EXPIRY_MARGIN
+        )
+        return access_token, expires_at
 
     def _get_graph_auth_token(self) -> Dict[str, Any]:
         """Get authentication token from Microsoft Graph API"""
@@ -64,7 +141,7 @@ class MicrosoftGraphAuthentication:
             f"&grant_type={grant_type}"
         )
 
-        response = requests.post(
+        response = self.session.post(
             url=self.auth_token_url,
             data=payload,
             headers={"Content-Type": "application/x-www-form-urlencoded"},
@@ -90,7 +167,9 @@ def test_authentication(auth_params):  # must have function
         url = (
             f"{integration.auth_url}/{integration.tenant_id}/oauth2/v2.0/token"
         )
-        response = requests.post(url=url, data=payload)
+        response = requests.post(
+            url=url, data=payload, timeout=DEFAULT_TIMEOUT
+        )
         response.raise_for_status()
 
         if response.json().get("access_token"):
@@ -1,11 +1,34 @@
 from .authentication import MicrosoftGraphAuthentication
-from common.types import InputParameter, DataType, OutputParameter
+from common.types import (
+    InputType,
+    InputParameter,
+    DataType,
+    OutputParameter,
+    compile_outputs,
+)
+from common.registry import (
+    get_provider,
+    invalidate_provider,
+    is_auth_failure,
+)
+from common.deadline import (
+    DeadlineExceeded,
+    DEADLINE_EXCEEDED_STATUS,
+    propagate,
+    with_deadline,
+)
+from common.circuit_breaker import CircuitOpenError, CIRCUIT_OPEN_STATUS
+from common.batch import run_batch
+from common.memo import memoize
+from common.streaming import page_chunk, error_chunk, single_chunk
+from common.json_stream import read_json_items
 
 # -----------------------------------------------------#
 # Copy the code below and ignore the libraries above
 # -----------------------------------------------------#
 
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
 import time
 
 ### Input Parameters
@@ -26,13 +49,26 @@ EMAIL = InputParameter(
     data_type=DataType.STRING,
     optional=True,
 )
+EMAILS = InputParameter(
+    "EMAILS",
+    description="List of email addresses to resolve in bulk; results are keyed by the input address",
+    data_type=DataType.JSON,
+    input_type=InputType.LIST,
+    optional=True,
+)
+TIMEOUT = InputParameter(
+    "TIMEOUT",
+    description="Total time budget in seconds for the skill run; every request and poll is bounded by what is left (default 120)",
+    data_type=DataType.INT,
+    optional=True,
+)
 ### End of Input Parameters
 
 ### Output Parameters
 STATUS = OutputParameter(
     name="STATUS",
     description="Status of the skill execution",
-    data_type=DataType.STRING,
+    data_type=DataType.INT,
 )
 USER_DETAILS = OutputParameter(
     name="USER_DETAILS",
@@ -41,10 +77,100 @@ USER_DETAILS = OutputParameter(
 )
 ### End of Output Parameters
 
+# Coerces the outputs of every result to their declared types
+OUTPUTS = compile_outputs(STATUS, USER_DETAILS)
+
+# Time budget of a run_skill call unless TIMEOUT is set
+DEFAULT_TIMEOUT_BUDGET = 2 * 60
+
+# Seconds an identical lookup is answered from the result cache
+RESULT_TTL = 5 * 60
+
+# Items of a run_skill_batch call executed at the same time
+BATCH_CONCURRENCY = 8
+
+# Graph accepts at most 15 values in one `in` expression
+EMAILS_PER_FILTER = 15
+# Keep request URLs comfortably below Graph's URL length limit
+MAX_URL_LENGTH = 2000
+# Concurrent chunk requests per bulk lookup
+BULK_CONCURRENCY = 4
+# Users per page requested by run_skill_stream ($top, Graph allows 999)
+STREAM_PAGE_SIZE = 200
+
+
+def _odata_quote(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _email_filter(emails):
+    values = ",".join(_odata_quote(email) for email in emails)
+    return f"mail in ({values}) or userPrincipalName in ({values})"
+
+
+def _chunk_emails(url, emails):
+    """Group emails into filters that respect the value and URL limits"""
+    chunks = []
+    chunk = []
+    for email in emails:
+        candidate = chunk + [email]
+        query = urlencode({"$filter": _email_filter(candidate)})
+        if chunk and (
+            len(candidate) > EMAILS_PER_FILTER
+            or len(url) + 1 + len(query) > MAX_URL_LENGTH
+        ):
+            chunks.append(chunk)
+            candidate = [email]
+        chunk = candidate
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _resolve_emails(integration, url, emails):
+    """Look up many addresses with chunked `in` filters run concurrently"""
+    unique_emails = list(dict.fromkeys(email.strip() for email in emails))
+
+    def fetch_chunk(chunk):
+        users = []
+        next_url = url
+        params = {"$filter": _email_filter(chunk)}
+        while next_url:
+            response = integration.get(next_url, params=params, stream=True)
+            with response:
+                response.raise_for_status()
+                page = read_json_items(response, "value")
+            users.extend(page.get("value", []))
+            next_url = page.get("@odata.nextLink")
+            params = None
+        return users
+
+    with ThreadPoolExecutor(max_workers=BULK_CONCURRENCY) as executor:
+        chunk_users = list(
+            executor.map(
+                propagate(fetch_chunk), _chunk_emails(url, unique_emails)
+            )
+        )
+
+    resolved = {email: [] for email in unique_emails}
+    by_address = {email.lower(): email for email in unique_emails}
+    for users in chunk_users:
+        for user in users:
+            matched = set()
+            for address in (user.get("mail"), user.get("userPrincipalName")):
+                email = by_address.get((address or "").lower())
+                if email is not None and email not in matched:
+                    matched.add(email)
+                    resolved[email].append(user)
+    return resolved
 
+
+@OUTPUTS
+@memoize(ttl=RESULT_TTL)
+@with_deadline(TIMEOUT, DEFAULT_TIMEOUT_BUDGET, USER_DETAILS)
 def run_skill(input_params, auth_params):
     """This will be called to run the skill"""
-    integration = MicrosoftGraphAuthentication(auth_params)
+    integration = get_provider(MicrosoftGraphAuthentication, auth_params)
     ## Logic Starts Here
     try:
         api_start_time = time.time()
@@ -52,26 +178,36 @@ def run_skill(input_params, auth_params):
         # Read all input parameters
         user_id = USER_ID.read_value(input_params)
         email = EMAIL.read_value(input_params)
-
-        # Get headers with authentication token
-        headers = integration.get_headers()
+        emails = EMAILS.read_value(input_params)
 
         # Construct URL
         url = f"{integration.base_url}/v1.0/users"
 
+        if emails and not user_id:
+            if isinstance(emails, str):
+                emails = [emails]
+            user_details = _resolve_emails(integration, url, emails)
+            print(
+                f"User Details fetched successfully, time_taken={time.time() - api_start_time}"
+            )
+            return {
+                "STATUS": 200,
+                "USER_DETAILS": user_details,
+            }
+
+        params = None
         if user_id:
             url = url + "/" + user_id
         elif email:
-            url = (
-                url
-                + f"?$filter=mail eq '{email}' or userPrincipalName eq '{email}'"
-            )
-
-        # Make the API request
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
+            params = {
+                "$filter": f"mail eq {_odata_quote(email)} or userPrincipalName eq {_odata_quote(email)}"
+            }
 
-        user_details = response.json()
+        # Make the API request; filter results are decoded as they arrive
+        response = integration.get(url, params=params, stream=True)
+        with response:
+            response.raise_for_status()
+            user_details = read_json_items(response, "value")
         print(
             f"User Details fetched successfully, time_taken={time.time() - api_start_time}"
         )
@@ -79,9 +215,97 @@ def run_skill(input_params, auth_params):
             "STATUS": response.status_code,
             "USER_DETAILS": user_details,
         }
+    except CircuitOpenError as e:
+        return {
+            "STATUS": CIRCUIT_OPEN_STATUS,
+            "USER_DETAILS": str(e),
+        }
+    except DeadlineExceeded as e:
+        return {
+            "STATUS": DEADLINE_EXCEEDED_STATUS,
+            "USER_DETAILS": str(e),
+        }
     except Exception as e:
+        if is_auth_failure(e):
+            # Rejected credentials: build a fresh provider on the next call
+            invalidate_provider(MicrosoftGraphAuthentication, auth_params)
         return {
             "STATUS": 500,
             "USER_DETAILS": str(e),
         }
     ## Logic Ends Here
+
+
+def run_skill_batch(list_of_input_params, auth_params):
+    """
+    Optional batch entry point. Fetches user details for each input_params
+    with one shared provider, session and token; results keep input order.
+    """
+    return run_batch(
+        lambda input_params: run_skill(input_params, auth_params),
+        list_of_input_params,
+        max_concurrency=BATCH_CONCURRENCY,
+    )
+
+
+@OUTPUTS
+@with_deadline(TIMEOUT, DEFAULT_TIMEOUT_BUDGET, USER_DETAILS)
+def run_skill_stream(input_params, auth_params):
+    """
+    Optional streaming entry point. Yields each page of users as soon as it
+    arrives by following @odata.nextLink. USER_ID and EMAILS lookups are
+    answered in a single chunk.
+    """
+    integration = get_provider(MicrosoftGraphAuthentication, auth_params)
+    try:
+        user_id = USER_ID.read_value(input_params)
+        email = EMAIL.read_value(input_params)
+        emails = EMAILS.read_value(input_params)
+
+        if user_id or emails:
+            result = run_skill(input_params, auth_params)
+            # One user for USER_ID, one entry per address for EMAILS
+            if result.get("STATUS") != 200:
+                returned = 0
+            elif user_id:
+                returned = 1
+            else:
+                returned = 1 if isinstance(emails, str) else len(emails)
+            yield single_chunk(result, returned)
+            return
+
+        next_url = f"{integration.base_url}/v1.0/users"
+        params = {"$top": STREAM_PAGE_SIZE}
+        if email:
+            params["$filter"] = (
+                f"mail eq {_odata_quote(email)} or userPrincipalName eq {_odata_quote(email)}"
+            )
+
+        returned = 0
+        page_number = 0
+        while next_url:
+            response = integration.get(next_url, params=params, stream=True)
+            with response:
+                response.raise_for_status()
+                page = read_json_items(response, "value")
+
+            next_url = page.get("@odata.nextLink")
+            params = None  # the next link already carries the query
+            returned += len(page.get("value", []))
+            page_number += 1
+            yield page_chunk(
+                USER_DETAILS.name,
+                page,
+                page_number,
+                returned,
+                done=not next_url,
+            )
+    except CircuitOpenError as e:
+        yield error_chunk(USER_DETAILS.name, e, status=CIRCUIT_OPEN_STATUS)
+    except DeadlineExceeded as e:
+        yield error_chunk(USER_DETAILS.name, e, status=DEADLINE_EXCEEDED_STATUS)
+    except Exception as e:
+        if is_auth_failure(e):
+            # Rejected credentials: build a fresh provider on the next call
+            invalidate_provider(MicrosoftGraphAuthentication, auth_params)
+        yield error_chunk(USER_DETAILS.name, e)
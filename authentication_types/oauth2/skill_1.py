@@ -1,11 +1,18 @@
-from .authentication import MyIntegrationProvider, test_authentication
+from .authentication import MyIntegrationProvider, REQUEST_TIMEOUT
 from common.types import InputType, InputParameter, DataType, OutputParameter
 
 # -----------------------------------------------------#
 # Copy the code below and ignore the libraries above
 # -----------------------------------------------------#
 
-import requests
+try:
+    # Reuses one provider per connection when the runtime ships common/
+    from common.registry import get_provider
+except ImportError:
+
+    def get_provider(provider_class, auth_params):
+        return provider_class(auth_params)
+
 
 ### Input Parameters
 INSTANCE = InputParameter(
@@ -49,19 +56,22 @@ LOGS = OutputParameter(
 
 def run_skill(input_params, auth_params):
     """This will be called to run the skill"""
-    integration = MyIntegrationProvider(auth_params)
-    test_authentication(auth_params)
+    # The request below authenticates through the shared token store, so
+    # the run does not fetch a token of its own to test the credentials
+    integration = get_provider(MyIntegrationProvider, auth_params)
     ## Logic Starts Here
 
     try:
         url = f"{integration.token_url}/query"  # Using token_url as base URL
-        headers = integration.get_headers()
         payload = {
             "query": QUERY.read_value(input_params),
             "limit": LIMIT.read_value(input_params),
             "offset": OFFSET.read_value(input_params),
         }
-        response = requests.post(url, headers=headers, json=payload)
+        # Sends the bearer token, refreshed once if the API answers 401
+        response = integration.request(
+            "POST", url, json=payload, timeout=REQUEST_TIMEOUT
+        )
         response.raise_for_status()
         return {
             "STATUS": response.status_code,
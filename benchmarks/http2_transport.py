@@ -0,0 +1,163 @@
+"""
+Compare the http1 (ProviderSession) and http2 (Http2Session) transports
+against a local HTTPS stand-in for a provider API that answers every call
+after a fixed delay.
+
+Run from the repository root:
+
+    python -m benchmarks.http2_transport [--calls 200] [--concurrency 20]
+
+Needs the optional dependencies: pip install "httpx[http2]" hypercorn
+trustme. Without them the benchmark is skipped.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import httpx  # noqa: F401
+    import h2  # noqa: F401
+    import trustme
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+except ImportError as e:
+    print(f"Skipping HTTP/2 benchmark, missing optional dependency: {e}")
+    sys.exit(0)
+
+from common.http_client import (
+    TRANSPORT_HTTP1,
+    TRANSPORT_HTTP2,
+    make_session,
+)
+
+
+# Seconds the stand-in provider takes to answer each call
+RESPONSE_DELAY = 0.02
+
+
+class StandInProvider:
+    """ASGI app recording the protocol and client socket of every call"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.connections = set()
+        self.protocols = set()
+
+    def reset(self) -> None:
+        self.connections.clear()
+        self.protocols.clear()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        self.connections.add(tuple(scope["client"]))
+        self.protocols.add(scope["http_version"])
+        await asyncio.sleep(self.delay)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"application/json")],
+            }
+        )
+        await send({"type": "http.response.body", "body": b'{"ok":true}'})
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app, directory: str):
+    """Serve `app` over TLS with h2 and http/1.1 ALPN, return (url, ca)"""
+    ca = trustme.CA()
+    cert_path = os.path.join(directory, "server.pem")
+    ca_path = os.path.join(directory, "ca.pem")
+    ca.issue_cert("localhost").private_key_and_cert_chain_pem.write_to_path(
+        cert_path
+    )
+    ca.cert_pem.write_to_path(ca_path)
+
+    port = _free_port()
+    config = Config()
+    config.bind = [f"localhost:{port}"]
+    config.certfile = cert_path
+    config.keyfile = cert_path
+    config.alpn_protocols = ["h2", "http/1.1"]
+    config.accesslog = None
+    config.errorlog = None
+
+    async def run():
+        # Runs until the process exits; signal handlers need the main thread
+        await serve(app, config, shutdown_trigger=asyncio.Event().wait)
+
+    threading.Thread(
+        target=asyncio.run, args=(run(),), name="stand-in", daemon=True
+    ).start()
+    for _ in range(100):
+        try:
+            socket.create_connection(("localhost", port), timeout=1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    else:
+        raise RuntimeError("Stand-in provider did not start")
+    return f"https://localhost:{port}/v1.0/users", ca_path
+
+
+def run_transport(transport, url, ca_path, calls, concurrency):
+    session = make_session(transport, pool_maxsize=concurrency)
+
+    def call(_):
+        response = session.get(url, verify=ca_path)
+        response.raise_for_status()
+        return response.json()
+
+    # Warm up so both transports start with an open connection
+    call(None)
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(call, range(calls)))
+    elapsed = time.monotonic() - started
+    session.close()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    app = StandInProvider(RESPONSE_DELAY)
+    with tempfile.TemporaryDirectory() as directory:
+        url, ca_path = start_server(app, directory)
+        for transport in (TRANSPORT_HTTP1, TRANSPORT_HTTP2):
+            app.reset()
+            elapsed = run_transport(
+                transport, url, ca_path, args.calls, args.concurrency
+            )
+            print(
+                f"{transport}: {args.calls} calls x{args.concurrency} "
+                f"in {elapsed:.3f}s ({args.calls / elapsed:.0f} calls/s), "
+                f"{len(app.connections)} connections, "
+                f"protocols {sorted(app.protocols)}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+from common.deadline import propagate
+
+
+DEFAULT_BATCH_CONCURRENCY = 8
+
+
+def run_batch(
+    run_item: Callable[[Dict[str, Any]], Dict[str, Any]],
+    list_of_input_params: List[Dict[str, Any]],
+    max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+) -> List[Dict[str, Any]]:
+    """
+    Run `run_item` for every input_params, at most `max_concurrency` at a
+    time, and return one result per item in input order. An item that raises
+    gets a STATUS 500 result instead of failing the whole batch.
+    """
+
+    def run_guarded(input_params):
+        try:
+            return run_item(input_params)
+        except Exception as e:
+            return {"STATUS": 500, "ERROR": str(e)}
+
+    if not list_of_input_params:
+        return []
+
+    workers = max(min(max_concurrency, len(list_of_input_params)), 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(
+            executor.map(propagate(run_guarded), list_of_input_params)
+        )
@@ -0,0 +1,234 @@
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Iterable, Optional, Pattern, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from common.deadline import sleep as deadline_sleep
+
+
+REDACTED = "REDACTED"
+# Header, query, form and JSON keys whose values never reach a cassette
+SECRET_KEYS = {
+    "authorization",
+    "x-rftoken",
+    "cookie",
+    "set-cookie",
+    "password",
+    "client_secret",
+    "access_token",
+    "refresh_token",
+    "id_token",
+    "sessionkey",
+    "api_key",
+    "apikey",
+    "token",
+}
+
+# (pattern, replacement) pairs masking values that differ between the
+# recording run and a replay, e.g. Splunk search ids derived from the clock
+VOLATILE_VALUES = (
+    (re.compile(r"sid_[0-9a-f]{32}"), "sid_VOLATILE"),
+)
+
+
+def _is_secret(key: str) -> bool:
+    return key.lower() in SECRET_KEYS
+
+
+def _redact_json(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            k: REDACTED if _is_secret(k) else _redact_json(v)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [_redact_json(v) for v in value]
+    return value
+
+
+def _redact_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = [
+        (k, REDACTED if _is_secret(k) else v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+    ]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _redact_headers(headers) -> Dict[str, str]:
+    return {
+        k: REDACTED if _is_secret(k) else v for k, v in dict(headers).items()
+    }
+
+
+def _redact_body(body: Any, content_type: str) -> Tuple[str, str]:
+    """Return (body, encoding) with secret fields of JSON/form bodies masked"""
+    if body is None:
+        return "", "text"
+    if isinstance(body, str):
+        body = body.encode()
+    try:
+        text = body.decode()
+    except UnicodeDecodeError:
+        return base64.b64encode(body).decode(), "base64"
+
+    if "json" in content_type:
+        try:
+            return json.dumps(_redact_json(json.loads(text))), "text"
+        except ValueError:
+            return text, "text"
+    if "x-www-form-urlencoded" in content_type:
+        pairs = [
+            (k, REDACTED if _is_secret(k) else v)
+            for k, v in parse_qsl(text, keep_blank_values=True)
+        ]
+        return urlencode(pairs), "text"
+    return text, "text"
+
+
+class Cassette:
+    """
+    NDJSON file of recorded request/response pairs with their latencies.
+    In record mode every exchange is appended with secrets redacted; in
+    replay mode exchanges are served back in recorded order per
+    (method, URL, body digest), sleeping `latency_scale` times the recorded
+    latency. `volatile` values are masked in URLs and bodies before they
+    are matched.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        mode: str = "replay",
+        latency_scale=1.0,
+        volatile: Iterable[Tuple[Pattern, str]] = VOLATILE_VALUES,
+    ):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unsupported cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.volatile = tuple(volatile)
+        self._lock = threading.Lock()
+        self._interactions: Dict[
+            Tuple[str, str, str], Deque[dict]
+        ] = defaultdict(deque)
+        if mode == "replay":
+            self._load()
+
+    def _normalize(self, text: str) -> str:
+        for pattern, replacement in self.volatile:
+            text = pattern.sub(replacement, text)
+        return text
+
+    def _key(self, method: str, url: str, body: str) -> Tuple[str, str, str]:
+        """Match key of a request from its redacted URL and body"""
+        digest = hashlib.sha256(self._normalize(body).encode()).hexdigest()
+        return method, self._normalize(url), digest
+
+    def _load(self) -> None:
+        with open(self.path) as f:
+            for line in f:
+                if line.strip():
+                    interaction = json.loads(line)
+                    request = interaction["request"]
+                    key = self._key(
+                        request["method"], request["url"], request["body"][0]
+                    )
+                    self._interactions[key].append(interaction)
+
+    def record(self, request, response, elapsed: float) -> None:
+        interaction = {
+            "request": {
+                "method": request.method,
+                "url": _redact_url(request.url),
+                "headers": _redact_headers(request.headers),
+                "body": _redact_body(
+                    request.body, request.headers.get("Content-Type", "")
+                ),
+            },
+            "response": {
+                "status": response.status_code,
+                "reason": response.reason,
+                "headers": _redact_headers(response.headers),
+                "body": _redact_body(
+                    response.content, response.headers.get("Content-Type", "")
+                ),
+            },
+            "elapsed": elapsed,
+            "recorded_at": time.time(),
+        }
+        line = json.dumps(interaction, separators=(",", ":")) + "\n"
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(line)
+
+    def replay(self, request) -> requests.Response:
+        body, _ = _redact_body(
+            request.body, request.headers.get("Content-Type", "")
+        )
+        key = self._key(request.method, _redact_url(request.url), body)
+        with self._lock:
+            queue = self._interactions.get(key)
+            if not queue:
+                raise LookupError(
+                    f"No recorded response for {key[0]} {key[1]} "
+                    f"with body digest {key[2][:12]}"
+                )
+            interaction = queue.popleft()
+            # Cycle so a cassette can drive longer runs than it recorded
+            queue.append(interaction)
+
+        deadline_sleep(interaction["elapsed"] * self.latency_scale)
+
+        recorded = interaction["response"]
+        body, encoding = recorded["body"]
+        response = requests.Response()
+        response.status_code = recorded["status"]
+        response.reason = recorded.get("reason")
+        response.headers = CaseInsensitiveDict(recorded["headers"])
+        response._content = (
+            base64.b64decode(body) if encoding == "base64" else body.encode()
+        )
+        # Lets iter_content serve the body for stream=True callers
+        response._content_consumed = True
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+
+_active_cassette: Optional[Cassette] = None
+
+
+def set_cassette(cassette: Optional[Cassette]) -> None:
+    """Record or replay all ProviderSession traffic, None turns it off"""
+    global _active_cassette
+    _active_cassette = cassette
+
+
+def active_cassette() -> Optional[Cassette]:
+    return _active_cassette
+
+
+# AIRMDR_CASSETTE=<path> AIRMDR_CASSETTE_MODE=record|replay
+# AIRMDR_CASSETTE_LATENCY_SCALE=<float> enables a cassette process-wide
+if os.environ.get("AIRMDR_CASSETTE"):
+    set_cassette(
+        Cassette(
+            os.environ["AIRMDR_CASSETTE"],
+            mode=os.environ.get("AIRMDR_CASSETTE_MODE", "replay"),
+            latency_scale=float(
+                os.environ.get("AIRMDR_CASSETTE_LATENCY_SCALE", "1.0")
+            ),
+        )
+    )
@@ -0,0 +1,145 @@
+from collections import deque
+from typing import Deque, Tuple
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from requests.exceptions import Timeout
+
+from common.deadline import bounded_by_deadline
+
+
+# run_skill STATUS returned while a provider's circuit is open
+CIRCUIT_OPEN_STATUS = 503
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Tracks the error rate and latency of calls to one provider connection.
+
+    CLOSED: calls go through. When at least `min_calls` calls in the last
+    `window` seconds have `failure_rate` or more failures (errors, 5xx/429
+    responses or calls slower than `slow_call_seconds`) the circuit opens.
+    OPEN: calls fail immediately with CircuitOpenError for `open_seconds`.
+    HALF_OPEN: up to `half_open_calls` trial calls are let through; a
+    success closes the circuit again, a failure reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        min_calls: int = 5,
+        window: float = 60,
+        slow_call_seconds: float = 30,
+        open_seconds: float = 30,
+        half_open_calls: int = 1,
+    ):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_calls = 0
+        # (finished_at, failed) for calls inside the window
+        self._calls: Deque[Tuple[float, bool]] = deque()
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.time() - self._opened_at < self.open_seconds:
+                    raise CircuitOpenError(
+                        "Circuit open: provider is failing, retry later"
+                    )
+                self.state = self.HALF_OPEN
+                self._trial_calls = 0
+            if self.state == self.HALF_OPEN:
+                if self._trial_calls >= self.half_open_calls:
+                    raise CircuitOpenError(
+                        "Circuit half-open: waiting for trial call to finish"
+                    )
+                self._trial_calls += 1
+
+    def record(self, failed: bool, latency: float) -> None:
+        failed = failed or latency > self.slow_call_seconds
+        now = time.time()
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                if failed:
+                    self._open(now)
+                else:
+                    self.state = self.CLOSED
+                    self._calls.clear()
+                return
+            if self.state == self.OPEN:
+                # A call that started before the circuit opened
+                return
+
+            self._calls.append((now, failed))
+            while self._calls and now - self._calls[0][0] > self.window:
+                self._calls.popleft()
+            if len(self._calls) >= self.min_calls:
+                failures = sum(1 for _, f in self._calls if f)
+                if failures / len(self._calls) >= self.failure_rate:
+                    self._open(now)
+
+    def release(self) -> None:
+        """
+        Forget a call let through by before_call whose outcome says nothing
+        about the provider, e.g. one cut short by the caller's deadline.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN and self._trial_calls > 0:
+                self._trial_calls -= 1
+
+    def _open(self, now: float) -> None:
+        self.state = self.OPEN
+        self._opened_at = now
+        self._calls.clear()
+
+
+class CircuitBreakerAdapter(HTTPAdapter):
+    """HTTPAdapter that routes every request through a CircuitBreaker"""
+
+    def __init__(self, breaker: CircuitBreaker, *args, **kwargs):
+        self.breaker = breaker
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, *args, **kwargs):
+        self.breaker.before_call()
+        cut_by_deadline = bounded_by_deadline(kwargs.get("timeout"))
+        started = time.time()
+        try:
+            response = super().send(request, *args, **kwargs)
+        except Timeout:
+            if cut_by_deadline:
+                # The skill ran out of budget, the provider did not fail
+                self.breaker.release()
+            else:
+                self.breaker.record(True, time.time() - started)
+            raise
+        except Exception:
+            self.breaker.record(True, time.time() - started)
+            raise
+        failed = response.status_code >= 500 or response.status_code == 429
+        self.breaker.record(failed, time.time() - started)
+        return response
+
+
+def mount_circuit_breaker(session, breaker: CircuitBreaker, **adapter_kwargs):
+    """Route all http(s) traffic of `session` through `breaker`"""
+    adapter = CircuitBreakerAdapter(breaker, **adapter_kwargs)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
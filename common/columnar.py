@@ -0,0 +1,107 @@
+from typing import Any, Dict, Iterator, List, Optional
+import base64
+import json
+import zlib
+
+
+# Dictionary code of a field the row does not have, unlike an explicit null
+ABSENT = -1
+
+_MISSING = object()
+
+
+def _intern_key(value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return (type(value).__name__, value)
+    return ("json", json.dumps(value, sort_keys=True))
+
+
+def _encode_column(values: List[Any]) -> Any:
+    """
+    Dictionary-encode a column when it has repeated values or when some
+    rows lack the field, which only the ABSENT code can express
+    """
+    lookup: Dict[Any, int] = {}
+    dictionary = []
+    codes = []
+    has_absent = False
+    for value in values:
+        if value is _MISSING:
+            has_absent = True
+            codes.append(ABSENT)
+            continue
+        key = _intern_key(value)
+        code = lookup.get(key)
+        if code is None:
+            code = lookup[key] = len(dictionary)
+            dictionary.append(value)
+        codes.append(code)
+    if not has_absent and len(dictionary) * 2 > len(values):
+        return values
+    return {"dict": dictionary, "codes": codes}
+
+
+def encode_columnar(
+    rows: List[Dict[str, Any]],
+    fields: Optional[List[str]] = None,
+    compress: bool = False,
+) -> Dict[str, Any]:
+    """
+    Convert a list of row dicts into one fields list and per-column arrays.
+    Fields missing from a row get the ABSENT code, so iter_rows leaves them
+    out while explicit nulls come back as None.
+    """
+    if fields is None:
+        fields = []
+    fields = list(fields)
+    seen = set(fields)
+    for row in rows:
+        for name in row:
+            if name not in seen:
+                seen.add(name)
+                fields.append(name)
+
+    columns = [
+        _encode_column([row.get(name, _MISSING) for row in rows])
+        for name in fields
+    ]
+    encoded = {"format": "columnar", "fields": fields, "count": len(rows)}
+    if compress:
+        raw = json.dumps(columns, separators=(",", ":")).encode()
+        encoded["encoding"] = "zlib+base64"
+        encoded["columns"] = base64.b64encode(zlib.compress(raw)).decode()
+    else:
+        encoded["columns"] = columns
+    return encoded
+
+
+def is_columnar(value: Any) -> bool:
+    return isinstance(value, dict) and value.get("format") == "columnar"
+
+
+def iter_rows(encoded: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Lazily rebuild row dicts from a columnar encoding"""
+    columns = encoded["columns"]
+    if encoded.get("encoding") == "zlib+base64":
+        columns = json.loads(zlib.decompress(base64.b64decode(columns)))
+
+    readers = []
+    for column in columns:
+        if isinstance(column, dict):
+            dictionary = column["dict"]
+            readers.append(
+                lambda i, d=dictionary, c=column["codes"]: (
+                    _MISSING if c[i] == ABSENT else d[c[i]]
+                )
+            )
+        else:
+            readers.append(column.__getitem__)
+
+    fields = encoded["fields"]
+    for i in range(encoded["count"]):
+        row = {}
+        for name, read in zip(fields, readers):
+            value = read(i)
+            if value is not _MISSING:
+                row[name] = value
+        yield row
@@ -0,0 +1,257 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
+import queue
+
+from common.deadline import propagate
+
+
+DEFAULT_DAG_CONCURRENCY = 8
+
+# Placed on the event queue with the step when one skill call has finished
+_CALL_DONE = object()
+
+
+def lookup(value: Any, path: Optional[str]) -> Any:
+    """
+    Resolve a dotted path such as "ALERTS.data" or "entity.0.name" in a
+    skill result or item. An empty path returns the value itself.
+    """
+    if not path:
+        return value
+    for key in path.split("."):
+        if value is None:
+            return None
+        if isinstance(value, list):
+            try:
+                value = value[int(key)]
+            except (ValueError, IndexError):
+                return None
+        elif isinstance(value, dict):
+            value = value.get(key)
+        else:
+            return None
+    return value
+
+
+class Step:
+    """
+    One skill call in a DAG, run once per item emitted by the step it comes
+    `after` (or once, for a root step). When `after` is a sequence of step
+    names the step runs once, after all of them have finished, and its
+    upstream item is {step name: [items emitted by that step]}; it is
+    skipped if any of them emitted nothing.
+
+    `mapping` builds the call's input_params from the upstream item, as
+    {INPUT_NAME: dotted path in the item}, on top of the fixed
+    `input_params`. `items` selects what this step emits downstream from
+    each result: a dotted path to a list (each element is an item), to a
+    single value, or a callable taking the result. Without `items` the
+    whole result is the only item.
+
+    If `run_skill_stream` is given it is used instead of `run_skill`, and
+    the items of each chunk are passed downstream as soon as it arrives.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run_skill: Callable,
+        auth_params: Dict[str, Any],
+        input_params: Optional[Dict[str, Any]] = None,
+        mapping: Optional[Dict[str, str]] = None,
+        after: Union[str, Sequence[str], None] = None,
+        items: Union[str, Callable, None] = None,
+        run_skill_stream: Optional[Callable] = None,
+    ):
+        self.name = name
+        self.run_skill = run_skill
+        self.auth_params = auth_params
+        self.input_params = input_params or {}
+        self.mapping = mapping or {}
+        self.after = after
+        # Names of the steps this one waits for, and whether it joins them
+        self.joins = after is not None and not isinstance(after, str)
+        if after is None:
+            self.parents = ()
+        elif self.joins:
+            self.parents = tuple(dict.fromkeys(after))
+        else:
+            self.parents = (after,)
+        self.items = items
+        self.run_skill_stream = run_skill_stream
+
+    def build_input(self, item: Any) -> Dict[str, Any]:
+        input_params = dict(self.input_params)
+        for name, path in self.mapping.items():
+            value = lookup(item, path)
+            if value is not None:
+                input_params[name] = value
+        return input_params
+
+    def emitted_items(self, result: Dict[str, Any]) -> List[Any]:
+        if result.get("STATUS") != 200:
+            return []
+        if callable(self.items):
+            selected = self.items(result)
+        elif self.items:
+            selected = lookup(result, self.items)
+        else:
+            selected = result
+        if selected is None:
+            return []
+        return selected if isinstance(selected, list) else [selected]
+
+
+def _children(steps: List[Step]) -> Dict[Optional[str], List[Step]]:
+    by_name: Dict[str, Step] = {}
+    for step in steps:
+        if step.name in by_name:
+            raise ValueError(f"Duplicate step name: {step.name}")
+        by_name[step.name] = step
+
+    children: Dict[Optional[str], List[Step]] = {}
+    for step in steps:
+        if step.joins and not step.parents:
+            raise ValueError(f"Step {step.name} runs after no steps")
+        for parent in step.parents:
+            if parent not in by_name:
+                raise ValueError(
+                    f"Step {step.name} runs after unknown step {parent}"
+                )
+            children.setdefault(parent, []).append(step)
+        if not step.parents:
+            children.setdefault(None, []).append(step)
+
+    # Every step must be reachable once its parents are, otherwise it is
+    # in a cycle
+    waiting = {step.name: len(step.parents) or 1 for step in steps}
+    reachable, frontier = set(), [None]
+    while frontier:
+        for child in children.get(frontier.pop(), []):
+            waiting[child.name] -= 1
+            if waiting[child.name] == 0:
+                reachable.add(child.name)
+                frontier.append(child.name)
+    if len(reachable) != len(steps):
+        raise ValueError("Steps form a cycle")
+    return children
+
+
+def iter_dag(
+    steps: List[Step], max_concurrency: int = DEFAULT_DAG_CONCURRENCY
+) -> Iterator[Dict[str, Any]]:
+    """
+    Run a DAG of skill calls and yield one event per result (or stream
+    chunk) as soon as it is available:
+    {"step": name, "input_params": ..., "result": ...}.
+
+    Independent branches and the fan-out of each item run concurrently on
+    up to `max_concurrency` threads, and an item starts its downstream steps
+    as soon as it is emitted, so total latency follows the critical path
+    rather than the sum of the steps. Skills that build their provider with
+    common.registry.get_provider share connections across all calls. A
+    failing call yields a STATUS 500 result and stops only its own branch.
+    """
+    children = _children(steps)
+    events: queue.Queue = queue.Queue()
+
+    def run_call(step: Step, input_params: Dict[str, Any]) -> None:
+        try:
+            if step.run_skill_stream is not None:
+                for chunk in step.run_skill_stream(
+                    input_params, step.auth_params
+                ):
+                    events.put((step, input_params, chunk))
+            else:
+                events.put(
+                    (
+                        step,
+                        input_params,
+                        step.run_skill(input_params, step.auth_params),
+                    )
+                )
+        except Exception as e:
+            events.put((step, input_params, {"STATUS": 500, "ERROR": str(e)}))
+        finally:
+            events.put((_CALL_DONE, step))
+
+    # Calls in flight per step, and steps that will start no more calls
+    pending = {step.name: 0 for step in steps}
+    finished = set()
+    # Items gathered so far by each joining step, per parent
+    gathered = {
+        step.name: {parent: [] for parent in step.parents}
+        for step in steps
+        if step.joins
+    }
+    joined = set()
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        running = 0
+
+        def start(step: Step, item: Any) -> None:
+            nonlocal running
+            running += 1
+            pending[step.name] += 1
+            executor.submit(propagate(run_call), step, step.build_input(item))
+
+        def settle(step: Step) -> None:
+            """Start a join or mark `step` finished once its inputs are"""
+            if (
+                step.name in finished
+                or pending[step.name]
+                or any(parent not in finished for parent in step.parents)
+            ):
+                return
+            if step.joins and step.name not in joined:
+                joined.add(step.name)
+                if all(gathered[step.name].values()):
+                    start(step, gathered[step.name])
+                    return
+            finished.add(step.name)
+            for child in children.get(step.name, []):
+                settle(child)
+
+        for root in children.get(None, []):
+            start(root, {})
+
+        while running:
+            event = events.get()
+            if event[0] is _CALL_DONE:
+                running -= 1
+                pending[event[1].name] -= 1
+                settle(event[1])
+                continue
+            step, input_params, result = event
+            for item in step.emitted_items(result):
+                for child in children.get(step.name, []):
+                    if child.joins:
+                        gathered[child.name][step.name].append(item)
+                    else:
+                        start(child, item)
+            yield {
+                "step": step.name,
+                "input_params": input_params,
+                "result": result,
+            }
+
+
+def run_dag(
+    steps: List[Step], max_concurrency: int = DEFAULT_DAG_CONCURRENCY
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Run a DAG to completion and group its events by step name"""
+    results: Dict[str, List[Dict[str, Any]]] = {
+        step.name: [] for step in steps
+    }
+    for event in iter_dag(steps, max_concurrency):
+        results[event["step"]].append(event)
+    return results
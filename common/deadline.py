@@ -0,0 +1,189 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterable, Iterator, Optional
+import functools
+import inspect
+import time
+
+from common.streaming import error_chunk
+
+
+# run_skill STATUS returned when the invocation's time budget runs out
+DEADLINE_EXCEEDED_STATUS = 504
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a run_skill invocation has used up its time budget"""
+
+
+class Deadline:
+    def __init__(self, budget_seconds: float):
+        self.budget_seconds = budget_seconds
+        self.expires_at = time.monotonic() + budget_seconds
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def check(self) -> None:
+        if self.remaining() <= 0:
+            raise DeadlineExceeded(
+                f"Skill exceeded its time budget of {self.budget_seconds}s"
+            )
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar(
+    "current_deadline", default=None
+)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def _scoped(budget_seconds: float) -> Deadline:
+    """New deadline for a scope, never later than the enclosing one"""
+    deadline = Deadline(budget_seconds)
+    outer = _current_deadline.get()
+    if outer is not None and outer.expires_at < deadline.expires_at:
+        return outer
+    return deadline
+
+
+@contextmanager
+def deadline_scope(budget_seconds: Optional[float]) -> Iterator[None]:
+    """
+    Give everything run inside the block a total time budget. A nested scope
+    can only shorten the budget of the enclosing one.
+    """
+    if not budget_seconds:
+        yield
+        return
+    token = _current_deadline.set(_scoped(budget_seconds))
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+
+def timeout_for(max_timeout: Optional[float]) -> Optional[float]:
+    """Per-call timeout: `max_timeout` capped by what is left of the budget"""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return max_timeout
+    deadline.check()
+    remaining = deadline.remaining()
+    if max_timeout is None:
+        return remaining
+    return min(max_timeout, remaining)
+
+
+def bounded_by_deadline(timeout: Any) -> bool:
+    """
+    Whether a call's `timeout` (as returned by timeout_for) is what is left
+    of the current deadline rather than the call's own limit, i.e. whether
+    timing out would mean the budget ran out, not that the provider failed.
+    """
+    deadline = _current_deadline.get()
+    if isinstance(timeout, tuple):
+        timeout = max((t for t in timeout if t is not None), default=None)
+    if deadline is None or timeout is None:
+        return False
+    return timeout >= deadline.remaining()
+
+
+def within_deadline(chunks: Iterable[Any]) -> Iterator[Any]:
+    """
+    Re-check the deadline after each chunk of a body being downloaded. A
+    timeout only bounds each socket read, so a slow or large body could
+    otherwise keep the call running long past the budget.
+    """
+    for chunk in chunks:
+        deadline = _current_deadline.get()
+        if deadline is not None:
+            deadline.check()
+        yield chunk
+
+
+def sleep(seconds: float) -> None:
+    """time.sleep that never sleeps past the deadline"""
+    time.sleep(max(timeout_for(seconds), 0))
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.check()
+
+
+def propagate(fn: Callable) -> Callable:
+    """Carry the caller's deadline into `fn` when it runs on another thread"""
+    deadline = _current_deadline.get()
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        token = _current_deadline.set(deadline)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current_deadline.reset(token)
+
+    return run
+
+
+def with_deadline(
+    budget_param: Any, default_budget: float, output_param: Any
+) -> Callable:
+    """
+    Decorate a run_skill or run_skill_stream so each invocation runs inside
+    a deadline scope. The budget is read from the `budget_param` input, else
+    `default_budget`; an invalid budget is reported as a STATUS 500 result
+    (or final chunk) with the error under `output_param`.
+    """
+
+    def decorate(run_skill: Callable) -> Callable:
+        if inspect.isgeneratorfunction(run_skill):
+            return _stream_with_deadline(
+                run_skill, budget_param, default_budget, output_param
+            )
+
+        @functools.wraps(run_skill)
+        def run(input_params, auth_params, *args, **kwargs):
+            try:
+                budget = (
+                    budget_param.read_value(input_params) or default_budget
+                )
+            except Exception as e:
+                return {"STATUS": 500, output_param.name: str(e)}
+            with deadline_scope(budget):
+                return run_skill(input_params, auth_params, *args, **kwargs)
+
+        return run
+
+    return decorate
+
+
+def _stream_with_deadline(
+    run_skill_stream: Callable,
+    budget_param: Any,
+    default_budget: float,
+    output_param: Any,
+) -> Callable:
+    @functools.wraps(run_skill_stream)
+    def run(input_params, auth_params, *args, **kwargs):
+        try:
+            budget = budget_param.read_value(input_params) or default_budget
+        except Exception as e:
+            yield error_chunk(output_param.name, e)
+            return
+        deadline = _scoped(budget) if budget else _current_deadline.get()
+        chunks = run_skill_stream(input_params, auth_params, *args, **kwargs)
+        while True:
+            # The deadline is only set while the stream computes a chunk, so
+            # it does not leak into the consumer between chunks
+            token = _current_deadline.set(deadline)
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            finally:
+                _current_deadline.reset(token)
+            yield chunk
+
+    return run
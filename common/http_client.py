@@ -0,0 +1,343 @@
+from typing import Optional
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.hooks import dispatch_hook
+from requests.structures import CaseInsensitiveDict
+from requests.utils import default_headers
+
+from common.cassette import active_cassette
+from common.circuit_breaker import CircuitBreaker, mount_circuit_breaker
+from common.deadline import (
+    DeadlineExceeded,
+    bounded_by_deadline,
+    timeout_for,
+    within_deadline,
+)
+
+try:
+    # HTTP/2 needs the h2 extra: pip install "httpx[http2]"
+    import httpx
+except ImportError:
+    httpx = None
+
+
+# Upper bound for any single HTTP call made by a provider session
+DEFAULT_TIMEOUT = 30
+
+# Bytes read per step when a session downloads a whole body itself
+BODY_CHUNK_SIZE = 64 * 1024
+
+# Values of a connection's HTTP_TRANSPORT parameter
+TRANSPORT_HTTP1 = "http1"
+TRANSPORT_HTTP2 = "http2"
+
+
+class ProviderSession(requests.Session):
+    """
+    requests.Session shared by all calls of one provider connection. Every
+    request gets a timeout taken from what is left of the current deadline,
+    capped at `default_timeout`; as that only bounds each socket read, the
+    deadline is also re-checked while the body downloads. Requests
+    optionally go through a circuit breaker. When a cassette is active (see
+    common.cassette) traffic is recorded to it or replayed from it instead
+    of the network.
+    """
+
+    def __init__(
+        self,
+        breaker: Optional[CircuitBreaker] = None,
+        default_timeout: float = DEFAULT_TIMEOUT,
+        pool_maxsize: int = 10,
+    ):
+        super().__init__()
+        self.default_timeout = default_timeout
+        self.breaker = breaker
+        self.pool_maxsize = 0
+        self._pool_lock = threading.Lock()
+        self.ensure_pool_size(pool_maxsize)
+
+    def ensure_pool_size(self, pool_maxsize: int) -> None:
+        """
+        Keep up to `pool_maxsize` connections per host so that many
+        concurrent calls reuse this session instead of opening their own.
+        """
+        with self._pool_lock:
+            if pool_maxsize <= self.pool_maxsize:
+                return
+            self.pool_maxsize = pool_maxsize
+            if self.breaker is not None:
+                mount_circuit_breaker(
+                    self, self.breaker, pool_maxsize=pool_maxsize
+                )
+            else:
+                adapter = HTTPAdapter(pool_maxsize=pool_maxsize)
+                self.mount("https://", adapter)
+                self.mount("http://", adapter)
+
+    def request(self, method, url, **kwargs):
+        max_timeout = kwargs.get("timeout") or self.default_timeout
+        kwargs["timeout"] = timeout_for(max_timeout)
+        # The body is always downloaded here so the deadline bounds it too
+        stream = kwargs.get("stream", False)
+        kwargs["stream"] = True
+        try:
+            response = super().request(method, url, **kwargs)
+            if not stream:
+                with response:
+                    response._content = b"".join(
+                        within_deadline(
+                            response.iter_content(BODY_CHUNK_SIZE)
+                        )
+                    )
+            return response
+        except requests.exceptions.Timeout as e:
+            # The call was cut short by the deadline, not by its own limit
+            if kwargs["timeout"] < max_timeout:
+                raise DeadlineExceeded(str(e)) from e
+            raise
+
+    def send(self, request, **kwargs):
+        cassette = active_cassette()
+        if cassette is None:
+            return super().send(request, **kwargs)
+
+        if cassette.mode == "replay":
+            response = cassette.replay(request)
+            return dispatch_hook("response", request.hooks, response, **kwargs)
+
+        started = time.monotonic()
+        response = super().send(request, **kwargs)
+        cassette.record(request, response, time.monotonic() - started)
+        return response
+
+
+class Http2Session:
+    """
+    Drop-in for ProviderSession that sends requests over HTTP/2, so
+    concurrent calls to one host share a single multiplexed connection
+    instead of one socket and TLS handshake each.
+
+    Requests are prepared by `requests` (params, data, json, files, cookies
+    and auth behave the same) and the responses are converted back to
+    requests.Response, so skills keep using raise_for_status(), json(),
+    iter_content() and requests.HTTPError. `verify`, `stream` and
+    `allow_redirects` are honored; any other requests option (hooks,
+    proxies, cert, ...) raises TypeError. Timeouts, circuit breaker and
+    cassettes work as in ProviderSession.
+    """
+
+    def __init__(
+        self,
+        breaker: Optional[CircuitBreaker] = None,
+        default_timeout: float = DEFAULT_TIMEOUT,
+        pool_maxsize: int = 10,
+    ):
+        if httpx is None:
+            raise RuntimeError(
+                "The http2 transport requires httpx: "
+                'pip install "httpx[http2]"'
+            )
+        self.breaker = breaker
+        self.default_timeout = default_timeout
+        self.headers = default_headers()
+        self.verify = True
+        self.pool_maxsize = pool_maxsize
+        # httpx only sets TLS verification per client: one per `verify`
+        self._clients = {}
+        self._clients_lock = threading.Lock()
+
+    def _client(self, verify):
+        with self._clients_lock:
+            client = self._clients.get(verify)
+            if client is None:
+                client = self._clients[verify] = httpx.Client(
+                    http2=True,
+                    verify=verify,
+                    limits=httpx.Limits(
+                        max_connections=self.pool_maxsize,
+                        max_keepalive_connections=self.pool_maxsize,
+                    ),
+                )
+            return client
+
+    def request(
+        self,
+        method,
+        url,
+        params=None,
+        data=None,
+        headers=None,
+        cookies=None,
+        files=None,
+        auth=None,
+        timeout=None,
+        allow_redirects=True,
+        json=None,
+        stream=False,
+        verify=None,
+        **kwargs,
+    ):
+        unsupported = sorted(
+            name for name, value in kwargs.items() if value is not None
+        )
+        if unsupported:
+            raise TypeError(
+                f"Http2Session does not support: {', '.join(unsupported)}"
+            )
+        max_timeout = timeout or self.default_timeout
+        request = requests.Request(
+            method,
+            url,
+            headers={**self.headers, **(headers or {})},
+            params=params,
+            data=data,
+            files=files,
+            json=json,
+            auth=auth,
+            cookies=cookies,
+        ).prepare()
+        timeout = timeout_for(max_timeout)
+        try:
+            return self.send(
+                request,
+                timeout=timeout,
+                verify=self.verify if verify is None else verify,
+                stream=stream,
+                allow_redirects=allow_redirects,
+            )
+        except httpx.TimeoutException as e:
+            # Same contract as ProviderSession.request
+            if timeout < max_timeout:
+                raise DeadlineExceeded(str(e)) from e
+            raise requests.exceptions.Timeout(str(e)) from e
+
+    def send(
+        self,
+        request,
+        timeout=None,
+        verify=True,
+        stream=False,
+        allow_redirects=True,
+    ):
+        cassette = active_cassette()
+        if cassette is not None and cassette.mode == "replay":
+            return cassette.replay(request)
+
+        if self.breaker is not None:
+            self.breaker.before_call()
+        cut_by_deadline = bounded_by_deadline(timeout)
+        started = time.monotonic()
+        try:
+            client = self._client(verify)
+            raw = client.send(
+                client.build_request(
+                    request.method,
+                    request.url,
+                    headers=dict(request.headers),
+                    content=request.body,
+                    timeout=timeout,
+                ),
+                # Bodies are read here so the deadline bounds them too
+                stream=True,
+                follow_redirects=allow_redirects,
+            )
+            response = self._to_requests_response(request, raw, stream)
+        except httpx.TimeoutException:
+            if self.breaker is not None:
+                if cut_by_deadline:
+                    self.breaker.release()
+                else:
+                    self.breaker.record(True, time.monotonic() - started)
+            raise
+        except Exception:
+            if self.breaker is not None:
+                self.breaker.record(True, time.monotonic() - started)
+            raise
+        elapsed = time.monotonic() - started
+        if self.breaker is not None:
+            failed = response.status_code >= 500 or response.status_code == 429
+            self.breaker.record(failed, elapsed)
+        if cassette is not None:
+            cassette.record(request, response, elapsed)
+        return response
+
+    @staticmethod
+    def _to_requests_response(request, raw, stream) -> requests.Response:
+        response = requests.Response()
+        response.status_code = raw.status_code
+        response.reason = raw.reason_phrase
+        response.headers = CaseInsensitiveDict(raw.headers)
+        if stream:
+            # The body is read on demand by iter_content() or .content
+            response.raw = _StreamedBody(raw)
+        else:
+            try:
+                response._content = b"".join(
+                    within_deadline(raw.iter_bytes(BODY_CHUNK_SIZE))
+                )
+            finally:
+                raw.close()
+            response._content_consumed = True
+        response.encoding = raw.encoding
+        response.url = str(raw.url)
+        response.request = request
+        return response
+
+    def ensure_pool_size(self, pool_maxsize: int) -> None:
+        """Concurrent calls already share multiplexed HTTP/2 connections"""
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self) -> None:
+        with self._clients_lock:
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+
+
+class _StreamedBody:
+    """Exposes a streamed httpx response as requests' `Response.raw`"""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def stream(self, chunk_size, decode_content=True):
+        try:
+            yield from self._raw.iter_bytes(chunk_size)
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.ReadTimeout(str(e)) from e
+        finally:
+            self._raw.close()
+
+    def close(self) -> None:
+        self._raw.close()
+
+
+def make_session(
+    transport: Optional[str] = None,
+    breaker: Optional[CircuitBreaker] = None,
+    **kwargs,
+):
+    """Session for a connection's HTTP_TRANSPORT (http1 by default)"""
+    transport = transport or TRANSPORT_HTTP1
+    if transport == TRANSPORT_HTTP1:
+        return ProviderSession(breaker=breaker, **kwargs)
+    if transport == TRANSPORT_HTTP2:
+        return Http2Session(breaker=breaker, **kwargs)
+    raise ValueError(f"Unsupported HTTP_TRANSPORT: {transport}")
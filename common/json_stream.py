@@ -0,0 +1,199 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+import codecs
+import json
+import re
+
+from common.deadline import within_deadline
+
+
+# Bytes read from the socket per step when decoding a response
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_STRUCTURAL = re.compile(r'["\[\]{},:]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+# Returned by the array scanner when no item was completed
+_NO_ITEM = object()
+
+_SEEK = "seek"
+_ARRAY = "array"
+_REST = "rest"
+
+
+class JsonArrayStream:
+    """
+    Incremental decoder for a JSON object whose `key` member is a large
+    array, e.g. Splunk `results`, Recorded Future `data` or Graph `value`.
+
+    Iterating yields the array's items one by one while the body is still
+    being read, holding only the item being parsed in memory. Once the
+    iteration is finished `envelope` holds the rest of the object (paging
+    links, counts, ...) with `key` set to an empty list.
+    """
+
+    def __init__(self, chunks: Iterable[Union[bytes, str]], key: str):
+        self.key = key
+        self._chunks = chunks
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._phase = _SEEK
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        # Top-level member name being read and the last completed one
+        self._key_parts: Optional[List[str]] = None
+        self._member: Optional[str] = None
+        self._expect_key = False
+        self._value_start = False
+        self._item_depth = 0
+        self._item: List[str] = []
+        self._envelope: List[str] = []
+        self.envelope: Optional[Dict[str, Any]] = None
+
+    def __iter__(self) -> Iterator[Any]:
+        for chunk in self._chunks:
+            if isinstance(chunk, bytes):
+                chunk = self._decoder.decode(chunk)
+            yield from self._feed(chunk)
+        yield from self._feed(self._decoder.decode(b"", final=True))
+        if self._phase == _ARRAY:
+            raise ValueError("Response ended inside the streamed array")
+        self.envelope = json.loads("".join(self._envelope))
+
+    def _feed(self, text: str) -> Iterator[Any]:
+        pos = 0
+        while pos < len(text):
+            if self._in_string:
+                pos = self._scan_string(text, pos)
+            elif self._phase == _ARRAY:
+                pos, item = self._scan_array(text, pos)
+                if item is not _NO_ITEM:
+                    yield item
+            elif self._phase == _SEEK:
+                pos = self._scan_seek(text, pos)
+            else:
+                self._envelope.append(text[pos:])
+                pos = len(text)
+
+    def _out(self, text: str) -> None:
+        if self._phase == _ARRAY:
+            self._item.append(text)
+        else:
+            self._envelope.append(text)
+            if self._key_parts is not None:
+                self._key_parts.append(text)
+
+    def _scan_string(self, text: str, pos: int) -> int:
+        if self._escape:
+            self._escape = False
+            self._out(text[pos])
+            return pos + 1
+        match = _STRING_SPECIAL.search(text, pos)
+        if match is None:
+            self._out(text[pos:])
+            return len(text)
+        end = match.start()
+        if match.group() == "\\":
+            self._out(text[pos : end + 1])
+            self._escape = True
+            return end + 1
+        if self._key_parts is not None:
+            self._key_parts.append(text[pos:end])
+            self._envelope.append(text[pos : end + 1])
+            self._member = json.loads('"' + "".join(self._key_parts) + '"')
+            self._key_parts = None
+        else:
+            self._out(text[pos : end + 1])
+        self._in_string = False
+        return end + 1
+
+    def _scan_seek(self, text: str, pos: int) -> int:
+        match = _STRUCTURAL.search(text, pos)
+        if match is None:
+            self._envelope.append(text[pos:])
+            return len(text)
+        end = match.start()
+        char = match.group()
+        self._envelope.append(text[pos:end])
+        if char == "[" and self._value_start and self._member == self.key:
+            self._envelope.append("[")
+            self._phase = _ARRAY
+            self._value_start = False
+            return end + 1
+
+        self._envelope.append(char)
+        self._value_start = False
+        if char == '"':
+            self._in_string = True
+            if self._depth == 1 and self._expect_key:
+                self._key_parts = []
+        elif char in "{[":
+            self._depth += 1
+            self._expect_key = self._depth == 1 and char == "{"
+        elif char in "}]":
+            self._depth -= 1
+        elif char == ":" and self._depth == 1:
+            self._expect_key = False
+            self._value_start = True
+        elif char == "," and self._depth == 1:
+            self._expect_key = True
+        return end + 1
+
+    def _scan_array(self, text: str, pos: int):
+        match = _STRUCTURAL.search(text, pos)
+        if match is None:
+            self._item.append(text[pos:])
+            return len(text), _NO_ITEM
+        end = match.start()
+        char = match.group()
+        self._item.append(text[pos:end])
+        if self._item_depth == 0 and char in ",]":
+            item = self._flush_item()
+            if char == "]":
+                self._envelope.append("]")
+                self._phase = _REST
+            return end + 1, item
+
+        self._item.append(char)
+        if char == '"':
+            self._in_string = True
+        elif char in "{[":
+            self._item_depth += 1
+        elif char in "}]":
+            self._item_depth -= 1
+        return end + 1, _NO_ITEM
+
+    def _flush_item(self) -> Any:
+        text = "".join(self._item).strip()
+        self._item = []
+        if not text:
+            return _NO_ITEM
+        return json.loads(text)
+
+
+def iter_json_items(
+    response, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> JsonArrayStream:
+    """
+    Items of the `key` array of a JSON response, decoded while it downloads.
+    The request must be made with stream=True for memory to stay flat. The
+    current deadline is checked after every chunk.
+    """
+    return JsonArrayStream(
+        within_deadline(response.iter_content(chunk_size)), key
+    )
+
+
+def read_json_items(
+    response, key: str, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Any:
+    """
+    The whole JSON response, with its `key` array decoded item by item so
+    the raw body is never held in memory next to its decoded form. The
+    request must be made with stream=True.
+    """
+    stream = iter_json_items(response, key, chunk_size)
+    items = list(stream)
+    envelope = stream.envelope
+    if isinstance(envelope, dict) and key in envelope:
+        envelope[key] = items
+    return envelope
@@ -0,0 +1,277 @@
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+import glob
+import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+
+from common.json_stream import iter_json_items
+
+
+# One (record number, byte offset) checkpoint is kept every this many records
+# so readers can seek to a page without scanning the whole file.
+INDEX_INTERVAL = 1000
+# Records serialized to estimate the size of an in-memory output
+SIZE_SAMPLE = 64
+# Outputs estimated below this fraction of the threshold are not measured
+SIZE_ESTIMATE_MARGIN = 0.5
+# Spilled files older than this are deleted by later spills
+SPILL_TTL = 6 * 60 * 60
+# Minimum seconds between two sweeps for expired spilled files
+CLEANUP_INTERVAL = 10 * 60
+
+_SPILL_PREFIX = "airmdr-"
+_SPILL_SUFFIX = ".ndjson"
+_last_cleanup = 0.0
+_cleanup_lock = threading.Lock()
+
+
+def _estimated_size(records: List[Any]) -> int:
+    """Serialized size of `records` extrapolated from an even sample"""
+    if not records:
+        return 0
+    step = max(len(records) // SIZE_SAMPLE, 1)
+    sample = records[::step][:SIZE_SAMPLE]
+    sample_size = sum(
+        len(json.dumps(record, separators=(",", ":"))) + 1
+        for record in sample
+    )
+    return sample_size * len(records) // len(sample)
+
+
+def remove_expired_spills(
+    directory: Optional[str] = None, ttl: float = SPILL_TTL
+) -> None:
+    """Delete spilled output files in `directory` older than `ttl` seconds"""
+    pattern = os.path.join(
+        directory or tempfile.gettempdir(), f"{_SPILL_PREFIX}*{_SPILL_SUFFIX}"
+    )
+    expired_before = time.time() - ttl
+    for path in glob.glob(pattern):
+        try:
+            if os.path.getmtime(path) < expired_before:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def _maybe_cleanup(directory: Optional[str]) -> None:
+    global _last_cleanup
+    with _cleanup_lock:
+        if time.time() - _last_cleanup < CLEANUP_INTERVAL:
+            return
+        _last_cleanup = time.time()
+    remove_expired_spills(directory)
+
+
+def _spill_records(
+    records: Iterable[Any], threshold: int, directory: Optional[str]
+) -> Tuple[Optional[List[Any]], Optional[Dict[str, Any]]]:
+    """
+    Serialize records as NDJSON, moving to a file once they pass
+    `threshold` bytes. Returns (records, None) when they stayed small or
+    (None, handle) once spilled; the records are consumed only once.
+    """
+    kept: List[Any] = []
+    buffered: List[bytes] = []
+    buffered_size = 0
+    handle = None
+    path = None
+    index = []
+    size = 0
+    count = 0
+    try:
+        for record in records:
+            line = json.dumps(record, separators=(",", ":")).encode() + b"\n"
+            if count % INDEX_INTERVAL == 0:
+                index.append([count, size])
+            count += 1
+            size += len(line)
+            if handle is not None:
+                handle.write(line)
+                continue
+            kept.append(record)
+            buffered.append(line)
+            buffered_size += len(line)
+            if buffered_size <= threshold:
+                continue
+            _maybe_cleanup(directory)
+            fd, path = tempfile.mkstemp(
+                prefix=_SPILL_PREFIX, suffix=_SPILL_SUFFIX, dir=directory
+            )
+            handle = os.fdopen(fd, "wb")
+            handle.writelines(buffered)
+            buffered = []
+            kept = []
+    finally:
+        if handle is not None:
+            handle.close()
+
+    if path is None:
+        return kept, None
+    return None, {
+        "spilled": True,
+        "path": path,
+        "format": "ndjson",
+        "count": count,
+        "size_bytes": size,
+        "index": index,
+        "expires_at": time.time() + SPILL_TTL,
+    }
+
+
+def spill_if_large(
+    payload: Any,
+    records_key: str,
+    threshold: Optional[int] = None,
+    directory: Optional[str] = None,
+) -> Any:
+    """
+    Return `payload` unchanged when its `records_key` list is small, otherwise
+    write the records as NDJSON to a file and return a handle describing it.
+    Nothing is spilled unless a positive `threshold` is given. Payloads whose
+    sampled size estimate is well below the threshold are returned without
+    serializing every record.
+    """
+    if not threshold or threshold <= 0 or not isinstance(payload, dict):
+        return payload
+    records = payload.get(records_key)
+    if not isinstance(records, list):
+        return payload
+
+    if _estimated_size(records) < threshold * SIZE_ESTIMATE_MARGIN:
+        return payload
+
+    _, handle = _spill_records(records, threshold, directory)
+    if handle is None:
+        return payload
+    handle["metadata"] = {
+        k: v for k, v in payload.items() if k != records_key
+    }
+    return handle
+
+
+def read_records(
+    response,
+    records_key: str,
+    threshold: Optional[int] = None,
+    directory: Optional[str] = None,
+    transform=None,
+) -> Any:
+    """
+    Decode a JSON response whose `records_key` array may be too large to
+    hold in memory; the request must be made with stream=True.
+
+    Without a positive `threshold`, or when the body's Content-Length is
+    under it, the body is decoded with response.json(). Any other body is
+    decoded incrementally and its records are written to disk as soon as
+    they pass the threshold, so a large result never exists in memory as a
+    whole. Returns the payload, or a spilled handle as spill_if_large does.
+    `transform` may filter or modify the record stream (e.g. dedup) before
+    it is measured.
+    """
+    content_length = response.headers.get("Content-Length")
+    small = (
+        not threshold
+        or threshold <= 0
+        or (
+            content_length is not None
+            and not response.headers.get("Content-Encoding")
+            and int(content_length) < threshold * SIZE_ESTIMATE_MARGIN
+        )
+    )
+    if small:
+        payload = response.json()
+        if transform is not None and isinstance(payload, dict):
+            payload[records_key] = list(
+                transform(payload.get(records_key, []))
+            )
+        return payload
+
+    stream = iter_json_items(response, records_key)
+    records = stream if transform is None else transform(stream)
+    return collect_records(
+        records, records_key, lambda: stream.envelope, threshold, directory
+    )
+
+
+def collect_records(
+    records: Iterable[Any],
+    records_key: str,
+    envelope: Callable[[], Dict[str, Any]],
+    threshold: Optional[int] = None,
+    directory: Optional[str] = None,
+) -> Any:
+    """
+    Gather records arriving from any iterator (e.g. several paged requests)
+    under `records_key` of the dict returned by `envelope()`, which is only
+    called once the records are consumed. Past a positive `threshold` the
+    records go to disk as they arrive and a spilled handle is returned, as
+    with read_records.
+    """
+    if not threshold or threshold <= 0:
+        kept = list(records)
+        return {**envelope(), records_key: kept}
+
+    kept, handle = _spill_records(records, threshold, directory)
+    if handle is None:
+        return {**envelope(), records_key: kept}
+    handle["metadata"] = {
+        k: v for k, v in envelope().items() if k != records_key
+    }
+    return handle
+
+
+def is_spilled(value: Any) -> bool:
+    return isinstance(value, dict) and value.get("spilled") is True
+
+
+def iter_spilled(
+    handle: Dict[str, Any], start: int = 0, stop: Optional[int] = None
+) -> Iterator[Any]:
+    """Lazily yield records `start` to `stop` from a spilled output file"""
+    if stop is None:
+        stop = handle["count"]
+    if start >= stop or handle["size_bytes"] == 0:
+        return
+
+    number, offset = 0, 0
+    for checkpoint, checkpoint_offset in handle.get("index", []):
+        if checkpoint > start:
+            break
+        number, offset = checkpoint, checkpoint_offset
+
+    with open(handle["path"], "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            mm.seek(offset)
+            while number < stop:
+                line = mm.readline()
+                if not line:
+                    break
+                if number >= start:
+                    yield json.loads(line)
+                number += 1
+
+
+def read_spilled_page(
+    handle: Dict[str, Any], offset: int = 0, limit: int = 100
+) -> List[Any]:
+    return list(iter_spilled(handle, offset, offset + limit))
+
+
+def remove_spilled(handle: Dict[str, Any]) -> None:
+    try:
+        os.remove(handle["path"])
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,155 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import functools
+import json
+import threading
+import time
+
+from common.large_output import is_spilled
+from common.registry import auth_params_digest
+
+
+# Seconds a memoized result stays valid unless the skill sets its own TTL
+DEFAULT_RESULT_TTL = 300
+# Total size of the serialized results kept across all skills
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class ResultCache:
+    """
+    LRU of serialized skill results bounded by their total size in bytes.
+    Each entry carries its own expiry. Results are stored as JSON so every
+    hit hands out a fresh copy the caller is free to modify.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # key -> (expires_at, encoded result)
+        self._entries: "OrderedDict[Any, Tuple[float, bytes]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() >= entry[0]:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return json.loads(entry[1])
+
+    def put(self, key: Any, result: Dict[str, Any], ttl: float) -> None:
+        encoded = json.dumps(result, separators=(",", ":")).encode()
+        if len(encoded) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.time() + ttl, encoded)
+            self.size_bytes += len(encoded)
+            while self.size_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size_bytes": self.size_bytes,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def _remove(self, key: Any) -> None:
+        _, encoded = self._entries.pop(key)
+        self.size_bytes -= len(encoded)
+
+
+_results = ResultCache()
+
+
+def side_effects(run_skill: Callable) -> Callable:
+    """Mark a run_skill whose calls change provider state: never memoized"""
+    run_skill.has_side_effects = True
+    return run_skill
+
+
+def _skill_key(run_skill: Callable) -> str:
+    return f"{run_skill.__module__}.{run_skill.__qualname__}"
+
+
+def memoized(
+    run_skill: Callable,
+    ttl: float = DEFAULT_RESULT_TTL,
+    cache: Optional[ResultCache] = None,
+) -> Callable:
+    """
+    Wrap `run_skill` so a successful result is reused for `ttl` seconds by
+    calls with the same skill, input_params and connection. Skills marked
+    with @side_effects are returned unwrapped. Failed and spilled results
+    are never cached.
+    """
+    if getattr(run_skill, "has_side_effects", False):
+        return run_skill
+    cache = cache or _results
+    skill_key = _skill_key(run_skill)
+
+    @functools.wraps(run_skill)
+    def run(input_params, auth_params, *args, **kwargs):
+        try:
+            key = (
+                skill_key,
+                json.dumps(input_params, sort_keys=True),
+                auth_params_digest(auth_params),
+            )
+        except TypeError:
+            # Inputs that cannot be normalized are never cached
+            return run_skill(input_params, auth_params, *args, **kwargs)
+
+        result = cache.get(key)
+        if result is not None:
+            return result
+        result = run_skill(input_params, auth_params, *args, **kwargs)
+        if result.get("STATUS") == 200 and not any(
+            is_spilled(value) for value in result.values()
+        ):
+            try:
+                cache.put(key, result, ttl)
+            except TypeError:
+                pass
+        return result
+
+    return run
+
+
+def memoize(ttl: float = DEFAULT_RESULT_TTL) -> Callable:
+    """Decorator form of memoized with a per-skill TTL"""
+
+    def decorate(run_skill: Callable) -> Callable:
+        return memoized(run_skill, ttl=ttl)
+
+    return decorate
+
+
+def cache_stats() -> Dict[str, int]:
+    """Hit/miss/eviction counters and size of the shared result cache"""
+    return _results.stats()
+
+
+def clear_results() -> None:
+    _results.clear()
@@ -0,0 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+import heapq
+import itertools
+import threading
+import time
+
+
+# Threads running callbacks of operations that became ready
+DEFAULT_POLLER_WORKERS = 4
+
+
+class BackgroundPoller:
+    """
+    One daemon thread that polls many pending operations, so callers do not
+    have to block a worker thread in a sleep loop while they wait. Checks
+    should be cheap status reads: callbacks and errbacks run on a small
+    worker pool so slow ones never delay the other checks.
+    """
+
+    def __init__(
+        self, interval: float = 2.0, workers: int = DEFAULT_POLLER_WORKERS
+    ):
+        self.interval = interval
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="poller-callback"
+        )
+        # (next_check_at, sequence, task)
+        self._tasks: List[Tuple[float, int, dict]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(
+        self,
+        check: Callable[[], Any],
+        callback: Callable[[Any], None],
+        errback: Optional[Callable[[Exception], None]] = None,
+        interval: Optional[float] = None,
+        timeout: Optional[float] = None,
+    ) -> None:
+        """
+        Call `check()` every `interval` seconds until it returns something
+        other than None, then pass that value to `callback`. Exceptions from
+        `check` and running past `timeout` are passed to `errback`.
+        """
+        now = time.time()
+        task = {
+            "check": check,
+            "callback": callback,
+            "errback": errback,
+            "interval": interval or self.interval,
+            "deadline": now + timeout if timeout else None,
+        }
+        with self._condition:
+            heapq.heappush(
+                self._tasks,
+                (now + task["interval"], next(self._sequence), task),
+            )
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="background-poller", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+
+    def pending(self) -> int:
+        with self._condition:
+            return len(self._tasks)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._tasks:
+                    self._condition.wait()
+                next_check_at, _, task = self._tasks[0]
+                delay = next_check_at - time.time()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                heapq.heappop(self._tasks)
+            self._poll(task)
+
+    def _poll(self, task: dict) -> None:
+        try:
+            if task["deadline"] is not None and time.time() > task["deadline"]:
+                raise TimeoutError("Polling exceeded its timeout")
+            result = task["check"]()
+        except Exception as e:
+            self._executor.submit(self._report_error, task, e)
+            return
+
+        if result is None:
+            with self._condition:
+                heapq.heappush(
+                    self._tasks,
+                    (
+                        time.time() + task["interval"],
+                        next(self._sequence),
+                        task,
+                    ),
+                )
+            return
+
+        self._executor.submit(self._deliver, task, result)
+
+    def _deliver(self, task: dict, result: Any) -> None:
+        try:
+            task["callback"](result)
+        except Exception as e:
+            print(f"Poller callback failed: {str(e)}")
+
+    def _report_error(self, task: dict, error: Exception) -> None:
+        if task["errback"] is None:
+            print(f"Polling failed: {str(error)}")
+            return
+        try:
+            task["errback"](error)
+        except Exception as e:
+            print(f"Poller errback failed: {str(e)}")
@@ -0,0 +1,79 @@
+from typing import Any, Dict, Hashable, Tuple
+import hashlib
+import json
+import threading
+
+from common.lru import LRUCache
+
+
+# Provider instances kept alive across run_skill calls
+MAX_PROVIDERS = 256
+
+# HTTP statuses meaning a connection's credentials were rejected
+AUTH_FAILURE_STATUSES = (401,)
+
+_providers = LRUCache(maxsize=MAX_PROVIDERS)
+# Provider key -> lock held while that provider is built, so a slow
+# constructor only blocks callers of the same connection
+_build_locks: Dict[Hashable, threading.Lock] = {}
+_build_locks_lock = threading.Lock()
+
+
+def auth_params_digest(auth_params: Dict[str, Any]) -> str:
+    """Stable digest of a connection's parameters, secrets never stored raw"""
+    encoded = json.dumps(auth_params, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def _class_key(provider_class: type) -> str:
+    return f"{provider_class.__module__}.{provider_class.__qualname__}"
+
+
+def _provider_key(
+    provider_class: type, auth_params: Dict[str, Any]
+) -> Tuple[str, str]:
+    return _class_key(provider_class), auth_params_digest(auth_params)
+
+
+def get_provider(provider_class: type, auth_params: Dict[str, Any]) -> Any:
+    """
+    Return a cached `provider_class(auth_params)` instance. Entries are keyed
+    by the connection's full parameters, so changed credentials get a new
+    provider and the old one ages out of the LRU. A missing provider is
+    built once, outside the cache lock.
+    """
+    key = _provider_key(provider_class, auth_params)
+    provider = _providers.get(key)
+    if provider is not None:
+        return provider
+
+    with _build_locks_lock:
+        build_lock = _build_locks.setdefault(key, threading.Lock())
+    try:
+        with build_lock:
+            provider = _providers.get(key)
+            if provider is None:
+                provider = provider_class(auth_params)
+                _providers.put(key, provider)
+            return provider
+    finally:
+        with _build_locks_lock:
+            if _build_locks.get(key) is build_lock:
+                del _build_locks[key]
+
+
+def invalidate_provider(
+    provider_class: type, auth_params: Dict[str, Any]
+) -> None:
+    """Drop a connection's provider so the next call builds a fresh one"""
+    _providers.pop(_provider_key(provider_class, auth_params))
+
+
+def is_auth_failure(error: BaseException) -> bool:
+    """Whether `error` is an HTTP error for rejected credentials"""
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) in AUTH_FAILURE_STATUSES
+
+
+def clear_providers() -> None:
+    _providers.clear()
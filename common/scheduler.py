@@ -0,0 +1,247 @@
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional
+import threading
+
+from common.deadline import propagate
+
+
+# Tenants without an explicit weight get this share
+DEFAULT_WEIGHT = 1.0
+
+# Priority classes, highest first. Interactive work (UI authentication
+# tests, interactive playbook steps) always goes ahead of queued bulk work.
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BULK = "bulk"
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BULK)
+# Workers held back for each class so the other one can never take them
+DEFAULT_RESERVED = {PRIORITY_INTERACTIVE: 2, PRIORITY_BULK: 0}
+
+
+class _Task:
+    __slots__ = (
+        "fn",
+        "args",
+        "tenant",
+        "connection",
+        "cost",
+        "priority",
+        "future",
+    )
+
+    def __init__(self, fn, args, tenant, connection, cost, priority):
+        self.fn = fn
+        self.args = args
+        self.tenant = tenant
+        self.connection = connection
+        self.cost = cost
+        self.priority = priority
+        self.future = Future()
+
+
+class FairScheduler:
+    """
+    Runs skill executions on a shared pool of `max_workers` threads while
+    keeping tenants from starving each other.
+
+    Work is queued per tenant (e.g. an organization, or a (parent org, child
+    org) pair) and dispatched by weighted fair queuing: each tenant has a
+    virtual time that advances by cost / weight whenever one of its tasks
+    starts, and the backlogged tenant with the lowest virtual time goes
+    next. A tenant never runs more than `tenant_concurrency` tasks at once,
+    and a single connection never more than `connection_concurrency`.
+
+    Each priority class has its own queues. Higher classes are dispatched
+    first, and `reserved[priority]` workers are kept free for a class: other
+    classes may not occupy them, so interactive calls find a worker even
+    while bulk enrichment saturates the pool.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 16,
+        tenant_concurrency: int = 4,
+        connection_concurrency: int = 2,
+        weights: Optional[Dict[Hashable, float]] = None,
+        reserved: Optional[Dict[str, int]] = None,
+    ):
+        self.max_workers = max_workers
+        self.tenant_concurrency = tenant_concurrency
+        self.connection_concurrency = connection_concurrency
+        self.weights: Dict[Hashable, float] = dict(weights or {})
+        self.reserved = dict(
+            DEFAULT_RESERVED if reserved is None else reserved
+        )
+        if sum(self.reserved.values()) > max_workers:
+            raise ValueError("Reserved capacity exceeds max_workers")
+        # priority -> tenant -> queued tasks
+        self._queues: Dict[str, Dict[Hashable, Deque[_Task]]] = {
+            priority: defaultdict(deque) for priority in PRIORITIES
+        }
+        # priority -> tenant -> virtual time
+        self._virtual_time: Dict[str, Dict[Hashable, float]] = {
+            priority: defaultdict(float) for priority in PRIORITIES
+        }
+        self._running_priority: Dict[str, int] = defaultdict(int)
+        self._running_tenant: Dict[Hashable, int] = defaultdict(int)
+        self._running_connection: Dict[Hashable, int] = defaultdict(int)
+        self._condition = threading.Condition()
+        self._workers: List[threading.Thread] = []
+        self._shutdown = False
+
+    def set_weight(self, tenant: Hashable, weight: float) -> None:
+        with self._condition:
+            self.weights[tenant] = weight
+
+    def submit(
+        self,
+        tenant: Hashable,
+        fn: Callable,
+        *args: Any,
+        connection: Optional[Hashable] = None,
+        cost: float = 1.0,
+        priority: str = PRIORITY_BULK,
+    ) -> Future:
+        """Queue `fn(*args)` for `tenant` and return a Future for its result"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        task = _Task(propagate(fn), args, tenant, connection, cost, priority)
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("Scheduler has been shut down")
+            queues = self._queues[priority]
+            virtual_time = self._virtual_time[priority]
+            if not queues[tenant]:
+                # A tenant returning from idle starts at the current virtual
+                # time instead of spending credit saved while it was idle
+                virtual_time[tenant] = max(
+                    virtual_time[tenant], self._virtual_now(priority)
+                )
+            queues[tenant].append(task)
+            self._start_workers()
+            self._condition.notify()
+        return task.future
+
+    def submit_skill(
+        self,
+        tenant: Hashable,
+        run_skill: Callable,
+        input_params: Dict[str, Any],
+        auth_params: Dict[str, Any],
+        cost: float = 1.0,
+        priority: str = PRIORITY_BULK,
+    ) -> Future:
+        """Queue a run_skill call, using its INSTANCE as the connection"""
+        return self.submit(
+            tenant,
+            run_skill,
+            input_params,
+            auth_params,
+            connection=(tenant, input_params.get("INSTANCE")),
+            cost=cost,
+            priority=priority,
+        )
+
+    def submit_test_authentication(
+        self,
+        tenant: Hashable,
+        test_authentication: Callable,
+        auth_params: Dict[str, Any],
+    ) -> Future:
+        """Queue a UI authentication test in the interactive lane"""
+        return self.submit(
+            tenant,
+            test_authentication,
+            auth_params,
+            priority=PRIORITY_INTERACTIVE,
+        )
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+    def _virtual_now(self, priority: str) -> float:
+        virtual_time = self._virtual_time[priority]
+        backlogged = [
+            virtual_time[t] for t, q in self._queues[priority].items() if q
+        ]
+        return min(backlogged) if backlogged else 0.0
+
+    def _has_capacity(self, priority: str) -> bool:
+        """Whether a `priority` task may start without using others' reserve"""
+        running = sum(self._running_priority.values())
+        held_for_others = sum(
+            max(self.reserved.get(p, 0) - self._running_priority[p], 0)
+            for p in PRIORITIES
+            if p != priority
+        )
+        return running + held_for_others < self.max_workers
+
+    def _start_workers(self) -> None:
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(
+                target=self._work, name="fair-scheduler", daemon=True
+            )
+            self._workers.append(worker)
+            worker.start()
+
+    def _eligible(self, task: _Task) -> bool:
+        return (
+            task.connection is None
+            or self._running_connection[task.connection]
+            < self.connection_concurrency
+        )
+
+    def _next_task(self) -> Optional[_Task]:
+        """Pop the next task to run, or None if nothing may start now"""
+        for priority in PRIORITIES:
+            if not self._has_capacity(priority):
+                continue
+            queues = self._queues[priority]
+            virtual_time = self._virtual_time[priority]
+            candidates = sorted(
+                (virtual_time[tenant], tenant)
+                for tenant, queue in queues.items()
+                if queue
+                and self._running_tenant[tenant] < self.tenant_concurrency
+            )
+            for _, tenant in candidates:
+                queue = queues[tenant]
+                for index, task in enumerate(queue):
+                    if self._eligible(task):
+                        del queue[index]
+                        weight = self.weights.get(tenant, DEFAULT_WEIGHT)
+                        virtual_time[tenant] += task.cost / weight
+                        return task
+        return None
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                task = self._next_task()
+                while task is None:
+                    if self._shutdown:
+                        return
+                    self._condition.wait()
+                    task = self._next_task()
+                self._running_priority[task.priority] += 1
+                self._running_tenant[task.tenant] += 1
+                if task.connection is not None:
+                    self._running_connection[task.connection] += 1
+
+            if task.future.set_running_or_notify_cancel():
+                try:
+                    task.future.set_result(task.fn(*task.args))
+                except BaseException as e:
+                    task.future.set_exception(e)
+
+            with self._condition:
+                self._running_priority[task.priority] -= 1
+                self._running_tenant[task.tenant] -= 1
+                if task.connection is not None:
+                    self._running_connection[task.connection] -= 1
+                self._condition.notify_all()
@@ -0,0 +1,48 @@
+from typing import Any, Dict, Optional
+
+
+def progress(
+    page_number: int,
+    items_so_far: int,
+    total: Optional[int] = None,
+    done: bool = False,
+) -> Dict[str, Any]:
+    return {
+        "page": page_number,
+        "items": items_so_far,
+        "total": total,
+        "done": done,
+    }
+
+
+def page_chunk(
+    output_name: str,
+    page: Any,
+    page_number: int,
+    items_so_far: int,
+    total: Optional[int] = None,
+    done: bool = False,
+    status: int = 200,
+) -> Dict[str, Any]:
+    """One chunk yielded by a run_skill_stream generator"""
+    return {
+        "STATUS": status,
+        output_name: page,
+        "PROGRESS": progress(page_number, items_so_far, total, done),
+    }
+
+
+def single_chunk(result: Dict[str, Any], items: int) -> Dict[str, Any]:
+    """Wrap a complete run_skill result as the only chunk of a stream"""
+    return {**result, "PROGRESS": progress(1, items, items, True)}
+
+
+def error_chunk(
+    output_name: str, error: Exception, status: int = 500
+) -> Dict[str, Any]:
+    """Final chunk yielded when a run_skill_stream generator fails"""
+    return {
+        "STATUS": status,
+        output_name: str(error),
+        "PROGRESS": {"done": True},
+    }
@@ -0,0 +1,166 @@
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Tuple
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # No flock (Windows): tokens are still shared between threads
+    fcntl = None
+
+
+# AIRMDR_TOKEN_STORE_DIR overrides where tokens are shared on this host.
+# The default is per user so that accounts never share one directory.
+DEFAULT_TOKEN_STORE_DIR = os.path.join(
+    tempfile.gettempdir(),
+    (
+        f"airmdr-tokens-{os.getuid()}"
+        if hasattr(os, "getuid")
+        else "airmdr-tokens"
+    ),
+)
+
+
+def token_key(*parts: str) -> str:
+    """Store key for a token, e.g. token_key(token_url, client_id, secret)"""
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+def _check_private(directory: str) -> None:
+    """
+    Refuse a store directory that another user could read or plant tokens
+    in, e.g. one created in advance under the predictable default path.
+    """
+    if not hasattr(os, "getuid"):
+        return
+    st = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode):
+        raise PermissionError(f"Token store {directory} is not a directory")
+    if st.st_uid != os.getuid():
+        raise PermissionError(
+            f"Token store {directory} is owned by another user"
+        )
+    if st.st_mode & 0o077:
+        raise PermissionError(
+            f"Token store {directory} is accessible by group or others"
+        )
+
+
+class TokenStore:
+    """
+    Access tokens shared by every process on a host, one JSON file per key
+    holding the token and its expiry. Refreshes are serialized with an
+    exclusive flock on the key's lock file: the first process to find the
+    token missing or expired fetches it, the others wait on the lock and
+    then read what it wrote. Token files are only readable by their owner.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or os.environ.get(
+            "AIRMDR_TOKEN_STORE_DIR", DEFAULT_TOKEN_STORE_DIR
+        )
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        _check_private(self.directory)
+        self._thread_locks: Dict[str, threading.Lock] = {}
+        self._thread_locks_lock = threading.Lock()
+
+    def get_or_refresh(
+        self, key: str, fetch: Callable[[], Tuple[str, float]]
+    ) -> Tuple[str, float]:
+        """
+        Return (access_token, expires_at) for `key`, calling `fetch` for a
+        new pair only if no process holds an unexpired one.
+        """
+        token = self._read(key)
+        if token is not None:
+            return token
+        with self._locked(key):
+            # Another process may have refreshed while we waited
+            token = self._read(key)
+            if token is not None:
+                return token
+            access_token, expires_at = fetch()
+            self._write(key, access_token, expires_at)
+            return access_token, expires_at
+
+    def invalidate(self, key: str, access_token: Optional[str] = None) -> None:
+        """
+        Drop a token the provider rejected so the next caller refreshes.
+        With `access_token` only that token is dropped, not a newer one
+        another process already stored.
+        """
+        with self._locked(key):
+            if access_token is not None:
+                token = self._read(key)
+                if token is not None and token[0] != access_token:
+                    return
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read(self, key: str) -> Optional[Tuple[str, float]]:
+        try:
+            with open(self._path(key)) as f:
+                token = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if time.time() >= token.get("expires_at", 0):
+            return None
+        return token["access_token"], token["expires_at"]
+
+    def _write(self, key: str, access_token: str, expires_at: float) -> None:
+        # Write then rename so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(
+                    {
+                        "access_token": access_token,
+                        "expires_at": expires_at,
+                        "fetched_at": time.time(),
+                        "fetched_by": os.getpid(),
+                    },
+                    f,
+                )
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    @contextmanager
+    def _locked(self, key: str) -> Iterator[None]:
+        with self._thread_locks_lock:
+            thread_lock = self._thread_locks.setdefault(key, threading.Lock())
+        with thread_lock:
+            if fcntl is None:
+                yield
+                return
+            lock_path = os.path.join(self.directory, f"{key}.lock")
+            with open(lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+_default_store: Optional[TokenStore] = None
+_default_store_lock = threading.Lock()
+
+
+def shared_token_store() -> TokenStore:
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = TokenStore()
+        return _default_store
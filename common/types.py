@@ -1,5 +1,7 @@
 from enum import Enum
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Tuple
+import functools
+import inspect
 import json
 
 
@@ -107,3 +109,104 @@ class OutputParameter:
         self.name = name
         self.data_type = data_type
         self.description = description
+
+
+# Python types that already satisfy a DataType and are passed through as is
+_NATIVE_TYPES = {
+    DataType.STRING: (str,),
+    DataType.INT: (int,),
+    DataType.FLOAT: (float,),
+    DataType.BOOL: (bool,),
+    DataType.JSON: (dict, list),
+}
+
+
+def _coerce_string(value: Any) -> str:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def _coerce_json(value: Any) -> Any:
+    if not isinstance(value, str):
+        return value
+    try:
+        decoded = json.loads(value)
+    except ValueError:
+        decoded = None
+    if isinstance(decoded, (dict, list)):
+        return decoded
+    # Skills report failures as a message in place of the payload
+    return {"error": value}
+
+
+def _output_coercer(data_type: DataType) -> Callable[[Any], Any]:
+    if data_type == DataType.STRING:
+        return _coerce_string
+    if data_type == DataType.JSON:
+        return _coerce_json
+    return lambda value: convert_value(value, data_type)
+
+
+class OutputEncoder:
+    """
+    Compiled form of a skill's declared outputs. `coerce` converts every
+    declared output to its data_type in one pass; values that already have
+    the right Python type (and None) are not touched. Keys that are not
+    declared are passed through. A JSON output holding a string is parsed
+    when it is a JSON object or array, otherwise it is an error message and
+    becomes {"error": message}. `encode` returns the result as JSON bytes.
+
+    The encoder is also a decorator: applied to a run_skill or
+    run_skill_stream it coerces every result returned or chunk yielded.
+    """
+
+    def __init__(self, *outputs: OutputParameter):
+        # (name, native types, coercer) per declared output
+        self._fields: Tuple[Tuple[str, tuple, Callable], ...] = tuple(
+            (
+                output.name,
+                _NATIVE_TYPES[output.data_type],
+                _output_coercer(output.data_type),
+            )
+            for output in outputs
+        )
+
+    def coerce(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        coerced = dict(result)
+        for name, native_types, coercer in self._fields:
+            value = coerced.get(name)
+            # Exact type check: bool is an int but not a valid INT output
+            if value is None or type(value) in native_types:
+                continue
+            try:
+                coerced[name] = coercer(value)
+            except ValueError as e:
+                raise ValueError(f"Invalid output {name}: {str(e)}")
+        return coerced
+
+    def __call__(self, run_skill: Callable) -> Callable:
+        if inspect.isgeneratorfunction(run_skill):
+
+            @functools.wraps(run_skill)
+            def run_stream(*args, **kwargs):
+                for chunk in run_skill(*args, **kwargs):
+                    yield self.coerce(chunk)
+
+            return run_stream
+
+        @functools.wraps(run_skill)
+        def run(*args, **kwargs):
+            return self.coerce(run_skill(*args, **kwargs))
+
+        return run
+
+    def encode(self, result: Dict[str, Any]) -> bytes:
+        return json.dumps(
+            self.coerce(result), separators=(",", ":"), ensure_ascii=False
+        ).encode()
+
+
+def compile_outputs(*outputs: OutputParameter) -> OutputEncoder:
+    """Build the encoder for a skill's OutputParameters once, at import"""
+    return OutputEncoder(*outputs)
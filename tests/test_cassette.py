@@ -0,0 +1,104 @@
+import http.server
+import json
+import threading
+
+import pytest
+
+from common.cassette import Cassette, set_cassette
+from common.http_client import ProviderSession
+
+
+class EchoHandler(http.server.BaseHTTPRequestHandler):
+    """Answers with the request it received, and a secret to redact"""
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode()
+        payload = json.dumps(
+            {"path": self.path, "body": body, "access_token": "live-secret"}
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+def _redacted(payload):
+    return {**payload, "access_token": "REDACTED"}
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), EchoHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def no_cassette():
+    yield
+    set_cassette(None)
+
+
+def test_recorded_exchanges_replay_without_the_network(server, tmp_path):
+    path = str(tmp_path / "cassette.ndjson")
+    session = ProviderSession()
+
+    set_cassette(Cassette(path, mode="record"))
+    recorded = [
+        session.get(f"{server}/items", params={"page": 1}).json(),
+        session.post(f"{server}/search", json={"q": "a"}).json(),
+        session.post(f"{server}/search", json={"q": "b"}).json(),
+    ]
+    with open(path) as f:
+        assert "live-secret" not in f.read()
+
+    set_cassette(Cassette(path, mode="replay", latency_scale=0))
+    # Requests are matched on their body, not only on method and URL
+    replayed = [
+        session.post(f"{server}/search", json={"q": "b"}).json(),
+        session.post(f"{server}/search", json={"q": "a"}).json(),
+        session.get(f"{server}/items", params={"page": 1}).json(),
+    ]
+
+    assert replayed == [_redacted(recorded[i]) for i in (2, 1, 0)]
+
+
+def test_unrecorded_request_is_an_error(server, tmp_path):
+    path = str(tmp_path / "cassette.ndjson")
+    session = ProviderSession()
+    set_cassette(Cassette(path, mode="record"))
+    session.post(f"{server}/search", json={"q": "a"})
+
+    set_cassette(Cassette(path, mode="replay", latency_scale=0))
+
+    with pytest.raises(LookupError, match="No recorded response"):
+        session.post(f"{server}/search", json={"q": "other"})
+
+
+def test_clock_derived_splunk_sids_match_across_runs(server, tmp_path):
+    path = str(tmp_path / "cassette.ndjson")
+    session = ProviderSession()
+    recorded_sid = "sid_" + "0" * 32
+    replayed_sid = "sid_" + "f" * 32
+
+    set_cassette(Cassette(path, mode="record"))
+    recorded = session.post(
+        f"{server}/jobs/{recorded_sid}/control", data={"id": recorded_sid}
+    ).json()
+
+    set_cassette(Cassette(path, mode="replay", latency_scale=0))
+    replayed = session.post(
+        f"{server}/jobs/{replayed_sid}/control", data={"id": replayed_sid}
+    ).json()
+
+    assert replayed == _redacted(recorded)
@@ -0,0 +1,102 @@
+import pytest
+
+from common import circuit_breaker
+from common.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(circuit_breaker, "time", fake)
+    return fake
+
+
+def _call(breaker, failed, latency=0.1):
+    breaker.before_call()
+    breaker.record(failed, latency)
+
+
+def _opened_breaker():
+    breaker = CircuitBreaker(min_calls=4, failure_rate=0.5, open_seconds=30)
+    for failed in (False, True, False, True):
+        _call(breaker, failed)
+    assert breaker.state == CircuitBreaker.OPEN
+    return breaker
+
+
+def test_opens_at_the_failure_rate_once_enough_calls_were_seen(clock):
+    breaker = CircuitBreaker(min_calls=4, failure_rate=0.5)
+
+    for failed in (True, True, False):
+        _call(breaker, failed)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    _call(breaker, False)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = CircuitBreaker(min_calls=2, slow_call_seconds=5)
+
+    _call(breaker, False, latency=6)
+    _call(breaker, False, latency=7)
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_calls_outside_the_window_are_forgotten(clock):
+    breaker = CircuitBreaker(min_calls=4, failure_rate=0.5, window=60)
+    for _ in range(3):
+        _call(breaker, True)
+
+    clock.now += 61
+    _call(breaker, True)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_lets_one_trial_through_and_closes_on_success(clock):
+    breaker = _opened_breaker()
+
+    clock.now += 31
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError, match="half-open"):
+        breaker.before_call()
+
+    breaker.record(False, 0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_failed_trial_reopens_for_another_open_period(clock):
+    breaker = _opened_breaker()
+
+    clock.now += 31
+    _call(breaker, True)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now += 29
+    with pytest.raises(CircuitOpenError, match="Circuit open"):
+        breaker.before_call()
+
+
+def test_released_trial_frees_the_slot_without_closing(clock):
+    breaker = _opened_breaker()
+
+    clock.now += 31
+    breaker.before_call()
+    breaker.release()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()
@@ -0,0 +1,146 @@
+import threading
+import time
+
+import pytest
+
+from common.dag import Step, lookup, run_dag
+
+
+def _skill(output):
+    """run_skill returning {"STATUS": 200, "OUT": output(input_params)}"""
+
+    def run_skill(input_params, auth_params):
+        return {"STATUS": 200, "OUT": output(input_params)}
+
+    return run_skill
+
+
+def _inputs(events):
+    return [event["input_params"] for event in events]
+
+
+def test_lookup_resolves_dotted_paths():
+    value = {"ALERTS": {"data": [{"entity": {"name": "host"}}]}}
+
+    assert lookup(value, "ALERTS.data.0.entity.name") == "host"
+    assert lookup(value, "ALERTS.data.5.entity") is None
+    assert lookup(value, "") is value
+
+
+def test_each_emitted_item_fans_out_to_the_next_step():
+    steps = [
+        Step("ids", _skill(lambda i: [{"id": 1}, {"id": 2}]), {}, items="OUT"),
+        Step(
+            "detail",
+            _skill(lambda i: i["ID"] * 10),
+            {},
+            input_params={"LIMIT": 5},
+            mapping={"ID": "id"},
+            after="ids",
+        ),
+    ]
+
+    results = run_dag(steps)
+
+    assert sorted(_inputs(results["detail"]), key=str) == [
+        {"LIMIT": 5, "ID": 1},
+        {"LIMIT": 5, "ID": 2},
+    ]
+
+
+def test_join_step_runs_once_with_every_parents_items():
+    def slow(value):
+        def output(input_params):
+            time.sleep(0.05)
+            return value
+
+        return output
+
+    steps = [
+        Step("users", _skill(lambda i: ["u1", "u2"]), {}, items="OUT"),
+        Step(
+            "user",
+            _skill(slow({"name": "n"})),
+            {},
+            mapping={"USER": ""},
+            after="users",
+            items="OUT",
+        ),
+        Step("alerts", _skill(lambda i: ["a1"]), {}, items="OUT"),
+        Step(
+            "report",
+            _skill(lambda i: i),
+            {},
+            mapping={"USERS": "user", "ALERT": "alerts.0"},
+            after=["user", "alerts"],
+        ),
+    ]
+
+    results = run_dag(steps)
+
+    assert _inputs(results["report"]) == [
+        {"USERS": [{"name": "n"}, {"name": "n"}], "ALERT": "a1"}
+    ]
+
+
+def test_join_is_skipped_when_a_parent_emits_nothing():
+    steps = [
+        Step("full", _skill(lambda i: [1]), {}, items="OUT"),
+        Step("empty", _skill(lambda i: []), {}, items="OUT"),
+        Step("join", _skill(lambda i: i), {}, after=["full", "empty"]),
+    ]
+
+    assert run_dag(steps)["join"] == []
+
+
+def test_failing_call_stops_only_its_branch():
+    def fail(input_params, auth_params):
+        raise RuntimeError("boom")
+
+    steps = [
+        Step("bad", fail, {}),
+        Step("after_bad", _skill(lambda i: i), {}, after="bad"),
+        Step("good", _skill(lambda i: "ok"), {}),
+    ]
+
+    results = run_dag(steps)
+
+    assert results["bad"][0]["result"] == {"STATUS": 500, "ERROR": "boom"}
+    assert results["after_bad"] == []
+    assert results["good"][0]["result"]["OUT"] == "ok"
+
+
+def test_independent_branches_run_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+
+    def meet(input_params, auth_params):
+        barrier.wait()
+        return {"STATUS": 200}
+
+    results = run_dag([Step("left", meet, {}), Step("right", meet, {})])
+
+    assert [len(results[name]) for name in ("left", "right")] == [1, 1]
+
+
+@pytest.mark.parametrize(
+    "steps, message",
+    [
+        (
+            [Step("a", None, {}, after="b"), Step("b", None, {}, after="a")],
+            "cycle",
+        ),
+        (
+            [
+                Step("root", None, {}),
+                Step("a", None, {}, after=["root", "b"]),
+                Step("b", None, {}, after="a"),
+            ],
+            "cycle",
+        ),
+        ([Step("a", None, {}, after="missing")], "unknown step"),
+        ([Step("a", None, {}), Step("a", None, {})], "Duplicate"),
+    ],
+)
+def test_invalid_graphs_are_rejected(steps, message):
+    with pytest.raises(ValueError, match=message):
+        run_dag(steps)
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from common.json_stream import JsonArrayStream
+
+
+BODY = {
+    "meta": {"total": 3, "note": 'quote " and [bracket]'},
+    "data": [
+        {"id": 1, "title": "a \"quoted\" title, with: commas"},
+        {"id": 2, "path": "C:\\temp\\{x}", "tags": [["nested", [1, 2]], []]},
+        {"id": 3, "name": "caf\u00e9 \u2603", "empty": {}},
+    ],
+    "next": None,
+}
+
+
+def _chunks(data: bytes, size: int):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 10000])
+def test_items_survive_any_chunk_split(size):
+    raw = json.dumps(BODY, ensure_ascii=False).encode()
+    stream = JsonArrayStream(_chunks(raw, size), "data")
+
+    assert list(stream) == BODY["data"]
+    assert stream.envelope == {**BODY, "data": []}
+
+
+def test_escapes_and_nested_arrays_do_not_end_the_array():
+    raw = (
+        b'{"data": [["]", "\\\\", "\\"]"], {"a": [[], [["x"]]]}, "[,]"],'
+        b' "after": "\\"data\\": [1]"}'
+    )
+
+    stream = JsonArrayStream(_chunks(raw, 1), "data")
+
+    assert list(stream) == [["]", "\\", '"]'], {"a": [[], [["x"]]]}, "[,]"]
+    assert stream.envelope == {"data": [], "after": '"data": [1]'}
+
+
+def test_nested_member_with_the_same_key_is_not_streamed():
+    raw = b'{"meta": {"data": [9]}, "data": [1, 2]}'
+
+    stream = JsonArrayStream([raw], "data")
+
+    assert list(stream) == [1, 2]
+    assert stream.envelope["meta"] == {"data": [9]}
+
+
+def test_truncated_body_raises():
+    raw = b'{"data": [{"id": 1}, {"id": 2'
+
+    with pytest.raises(ValueError):
+        list(JsonArrayStream(_chunks(raw, 4), "data"))
@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+from common import memo
+from common.memo import ResultCache, memoized, side_effects
+
+
+AUTH = {"API_KEY": "secret"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(memo, "time", fake)
+    return fake
+
+
+def _counting_skill(status=200):
+    calls = []
+
+    def run_skill(input_params, auth_params):
+        calls.append(input_params)
+        return {"STATUS": status, "DATA": {"n": len(calls)}}
+
+    return run_skill, calls
+
+
+def _size(result):
+    return len(json.dumps(result, separators=(",", ":")).encode())
+
+
+def test_result_is_reused_until_its_ttl_expires(clock):
+    run_skill, calls = _counting_skill()
+    run = memoized(run_skill, ttl=60, cache=ResultCache())
+
+    first = run({"Q": 1}, AUTH)
+    clock.now += 59
+    assert run({"Q": 1}, AUTH) == first
+    assert len(calls) == 1
+
+    clock.now += 1
+    assert run({"Q": 1}, AUTH)["DATA"] == {"n": 2}
+
+
+def test_inputs_and_connection_are_part_of_the_key(clock):
+    run_skill, calls = _counting_skill()
+    run = memoized(run_skill, cache=ResultCache())
+
+    run({"Q": 1}, AUTH)
+    run({"Q": 2}, AUTH)
+    run({"Q": 1}, {"API_KEY": "other"})
+
+    assert len(calls) == 3
+
+
+def test_hits_are_copies(clock):
+    run_skill, _ = _counting_skill()
+    run = memoized(run_skill, cache=ResultCache())
+
+    run({}, AUTH)["DATA"]["n"] = 99
+
+    assert run({}, AUTH)["DATA"] == {"n": 1}
+
+
+def test_failures_and_side_effects_are_not_cached(clock):
+    failing, failing_calls = _counting_skill(status=500)
+    run = memoized(failing, cache=ResultCache())
+    run({}, AUTH)
+    run({}, AUTH)
+
+    writing, _ = _counting_skill()
+    writing = side_effects(writing)
+
+    assert len(failing_calls) == 2
+    assert memoized(writing, cache=ResultCache()) is writing
+
+
+def test_least_recently_used_entries_are_evicted_past_max_bytes(clock):
+    entry = {"STATUS": 200, "DATA": "x" * 100}
+    cache = ResultCache(max_bytes=_size(entry) * 2)
+
+    cache.put("a", entry, ttl=60)
+    cache.put("b", entry, ttl=60)
+    cache.get("a")
+    cache.put("c", entry, ttl=60)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == entry
+    assert cache.get("c") == entry
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size_bytes"] == _size(entry) * 2
+
+
+def test_result_larger_than_the_cache_is_not_stored(clock):
+    cache = ResultCache(max_bytes=10)
+
+    cache.put("big", {"STATUS": 200, "DATA": "x" * 100}, ttl=60)
+
+    assert cache.get("big") is None
+    assert cache.stats()["size_bytes"] == 0
+
+
+def test_expired_entry_frees_its_bytes(clock):
+    cache = ResultCache()
+    cache.put("a", {"STATUS": 200}, ttl=10)
+
+    clock.now += 10
+
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["size_bytes"] == 0
@@ -0,0 +1,97 @@
+import threading
+
+from common.scheduler import (
+    PRIORITY_BULK,
+    PRIORITY_INTERACTIVE,
+    FairScheduler,
+)
+
+
+NO_RESERVE = {PRIORITY_INTERACTIVE: 0, PRIORITY_BULK: 0}
+
+
+def _blocked_scheduler(**kwargs):
+    """Single-worker scheduler whose worker is held until the gate opens"""
+    scheduler = FairScheduler(max_workers=1, **kwargs)
+    started, gate = threading.Event(), threading.Event()
+
+    def hold():
+        started.set()
+        assert gate.wait(5)
+
+    scheduler.submit("gate", hold)
+    assert started.wait(5)
+    return scheduler, gate
+
+
+def _run_in_order(scheduler, gate, submissions):
+    order = []
+    futures = [
+        scheduler.submit(tenant, order.append, name, **kwargs)
+        for tenant, name, kwargs in submissions
+    ]
+    gate.set()
+    for future in futures:
+        future.result(timeout=5)
+    scheduler.shutdown()
+    return order
+
+
+def test_backlogged_tenants_take_turns():
+    scheduler, gate = _blocked_scheduler(reserved=NO_RESERVE)
+    submissions = [("a", f"a{i}", {}) for i in range(1, 5)]
+    submissions += [("b", f"b{i}", {}) for i in range(1, 3)]
+
+    order = _run_in_order(scheduler, gate, submissions)
+
+    assert order == ["a1", "b1", "a2", "b2", "a3", "a4"]
+
+
+def test_weight_scales_a_tenants_share():
+    scheduler, gate = _blocked_scheduler(
+        reserved=NO_RESERVE, weights={"a": 2}
+    )
+    submissions = [("a", f"a{i}", {}) for i in range(1, 5)]
+    submissions += [("b", f"b{i}", {}) for i in range(1, 3)]
+
+    order = _run_in_order(scheduler, gate, submissions)
+
+    assert order == ["a1", "b1", "a2", "a3", "b2", "a4"]
+
+
+def test_interactive_work_goes_ahead_of_queued_bulk_work():
+    scheduler, gate = _blocked_scheduler(reserved=NO_RESERVE)
+    submissions = [("a", f"bulk{i}", {}) for i in range(1, 3)]
+    submissions.append(
+        ("b", "interactive", {"priority": PRIORITY_INTERACTIVE})
+    )
+
+    order = _run_in_order(scheduler, gate, submissions)
+
+    assert order == ["interactive", "bulk1", "bulk2"]
+
+
+def test_reserved_worker_is_kept_for_interactive_work():
+    scheduler = FairScheduler(
+        max_workers=2, reserved={PRIORITY_INTERACTIVE: 1, PRIORITY_BULK: 0}
+    )
+    gate = threading.Event()
+    bulk_running = threading.Semaphore(0)
+
+    def bulk():
+        bulk_running.release()
+        assert gate.wait(5)
+
+    bulk_futures = [scheduler.submit("a", bulk) for _ in range(3)]
+    assert bulk_running.acquire(timeout=5)
+    interactive = scheduler.submit(
+        "b", lambda: "ok", priority=PRIORITY_INTERACTIVE
+    )
+
+    # The second worker is reserved, so only one bulk task is running
+    assert interactive.result(timeout=5) == "ok"
+    assert not bulk_running.acquire(timeout=0.2)
+    gate.set()
+    for future in bulk_futures:
+        future.result(timeout=5)
+    scheduler.shutdown()
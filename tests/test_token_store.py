@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from common import token_store
+from common.token_store import TokenStore, token_key
+
+
+PROCESSES = 6
+
+needs_fork_and_flock = pytest.mark.skipif(
+    token_store.fcntl is None
+    or "fork" not in multiprocessing.get_all_start_methods(),
+    reason="needs fork and flock",
+)
+
+
+def _refresh_in_process(directory, fetch_log, barrier, tokens):
+    def fetch():
+        with open(fetch_log, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        # Keep the lock long enough for every other process to queue on it
+        time.sleep(0.3)
+        return f"token-{os.getpid()}", time.time() + 3600
+
+    store = TokenStore(directory)
+    barrier.wait()
+    tokens.put(store.get_or_refresh(token_key("url", "client"), fetch)[0])
+
+
+@needs_fork_and_flock
+def test_one_process_refreshes_and_the_others_read_its_token(tmp_path):
+    directory = str(tmp_path / "tokens")
+    fetch_log = str(tmp_path / "fetches.log")
+    context = multiprocessing.get_context("fork")
+    barrier = context.Barrier(PROCESSES)
+    tokens = context.Queue()
+
+    processes = [
+        context.Process(
+            target=_refresh_in_process,
+            args=(directory, fetch_log, barrier, tokens),
+        )
+        for _ in range(PROCESSES)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=30)
+    assert all(process.exitcode == 0 for process in processes)
+
+    with open(fetch_log) as f:
+        fetchers = f.read().split()
+    assert len(fetchers) == 1
+    received = {tokens.get(timeout=5) for _ in range(PROCESSES)}
+    assert received == {f"token-{fetchers[0]}"}
+
+
+def test_expired_token_is_refreshed(tmp_path):
+    store = TokenStore(str(tmp_path / "tokens"))
+    key = token_key("url", "client")
+
+    store.get_or_refresh(key, lambda: ("old", time.time() - 1))
+    token, _ = store.get_or_refresh(key, lambda: ("new", time.time() + 60))
+
+    assert token == "new"
+
+
+def test_invalidate_keeps_a_newer_token(tmp_path):
+    store = TokenStore(str(tmp_path / "tokens"))
+    key = token_key("url", "client")
+    store.get_or_refresh(key, lambda: ("current", time.time() + 60))
+
+    store.invalidate(key, access_token="rejected-earlier")
+    assert store.get_or_refresh(key, pytest.fail)[0] == "current"
+
+    store.invalidate(key, access_token="current")
+    token, _ = store.get_or_refresh(key, lambda: ("next", time.time() + 60))
+    assert token == "next"
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX permissions")
+def test_directory_open_to_others_is_refused(tmp_path):
+    directory = tmp_path / "tokens"
+    directory.mkdir(mode=0o755)
+    directory.chmod(0o755)
+
+    with pytest.raises(PermissionError, match="group or others"):
+        TokenStore(str(directory))
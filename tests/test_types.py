@@ -0,0 +1,77 @@
+import pytest
+
+from common.types import DataType, OutputParameter, compile_outputs
+
+
+STATUS = OutputParameter(name="STATUS", data_type=DataType.STRING)
+COUNT = OutputParameter(name="COUNT", data_type=DataType.INT)
+EMPLOYEES = OutputParameter(name="EMPLOYEES", data_type=DataType.JSON)
+
+
+def test_error_string_in_json_output_is_wrapped():
+    outputs = compile_outputs(EMPLOYEES)
+    result = {"STATUS": 500, "EMPLOYEES": "Connection refused"}
+
+    assert outputs.coerce(result) == {
+        "STATUS": 500,
+        "EMPLOYEES": {"error": "Connection refused"},
+    }
+
+
+def test_json_string_holding_a_scalar_is_an_error_message():
+    outputs = compile_outputs(EMPLOYEES)
+
+    assert outputs.coerce({"EMPLOYEES": "404"}) == {
+        "EMPLOYEES": {"error": "404"}
+    }
+
+
+def test_json_string_holding_an_object_is_decoded():
+    outputs = compile_outputs(EMPLOYEES)
+
+    assert outputs.coerce({"EMPLOYEES": '{"data": [1]}'}) == {
+        "EMPLOYEES": {"data": [1]}
+    }
+
+
+def test_native_values_and_undeclared_keys_pass_through():
+    outputs = compile_outputs(EMPLOYEES)
+    employees = {"data": []}
+
+    coerced = outputs.coerce({"EMPLOYEES": employees, "PROGRESS": None})
+
+    assert coerced["EMPLOYEES"] is employees
+    assert coerced["PROGRESS"] is None
+
+
+def test_scalar_outputs_are_converted():
+    outputs = compile_outputs(STATUS, COUNT)
+
+    assert outputs.coerce({"STATUS": 200, "COUNT": "3"}) == {
+        "STATUS": "200",
+        "COUNT": 3,
+    }
+    with pytest.raises(ValueError, match="Invalid output COUNT"):
+        outputs.coerce({"COUNT": "three"})
+
+
+def test_encoder_decorates_run_skill_and_streams():
+    outputs = compile_outputs(EMPLOYEES)
+
+    @outputs
+    def run_skill(input_params, auth_params):
+        return {"STATUS": 500, "EMPLOYEES": "boom"}
+
+    @outputs
+    def run_skill_stream(input_params, auth_params):
+        yield {"STATUS": 200, "EMPLOYEES": {"data": [1]}}
+        yield {"STATUS": 500, "EMPLOYEES": "boom"}
+
+    assert run_skill({}, {})["EMPLOYEES"] == {"error": "boom"}
+    assert [chunk["EMPLOYEES"] for chunk in run_skill_stream({}, {})] == [
+        {"data": [1]},
+        {"error": "boom"},
+    ]
+    assert outputs.encode({"EMPLOYEES": "boom"}) == (
+        b'{"EMPLOYEES":{"error":"boom"}}'
+    )